@@ -0,0 +1,117 @@
+import sqlite3
+import threading
+import time
+
+# ------------------- ADMISION -------------------
+#
+# Control de entrada para las rutas pesadas (subidas y examenes): una
+# compuerta que limita cuantas corren a la vez en el proceso, y un limite de
+# tasa por expediente guardado en un SQLite local que comparten los workers.
+
+
+class Compuerta:
+    """Deja pasar hasta `limite` peticiones a la vez.
+
+    Las que no caben esperan hasta `espera` segundos, pero solo `en_espera` de
+    ellas: las demas se rechazan en el acto para no ocupar hilos esperando.
+    """
+
+    def __init__(self, limite, en_espera=0, espera=0.0):
+        self.limite = limite
+        self.en_espera = en_espera
+        self.espera = espera
+        self.activas = 0
+        self.esperando = 0
+        self._cond = threading.Condition()
+
+    def entrar(self):
+        with self._cond:
+            if self.activas < self.limite:
+                self.activas += 1
+                return True
+            if self.esperando >= self.en_espera:
+                return False
+
+            self.esperando += 1
+            try:
+                vence = time.monotonic() + self.espera
+                while self.activas >= self.limite:
+                    restante = vence - time.monotonic()
+                    if restante <= 0:
+                        return False
+                    self._cond.wait(restante)
+                self.activas += 1
+                return True
+            finally:
+                self.esperando -= 1
+
+    def salir(self):
+        with self._cond:
+            self.activas -= 1
+            self._cond.notify()
+
+
+class LimitadorTasa:
+    """Cubeta de fichas por clave: `capacidad` de rafaga y `por_minuto` de recarga.
+
+    Vive en un archivo SQLite para que todos los workers de la maquina vean
+    las mismas cuentas. Si el archivo no responde se deja pasar: el limite
+    protege al servidor, no debe tumbarlo.
+    """
+
+    def __init__(self, ruta, capacidad=5, por_minuto=6):
+        self.ruta = ruta
+        self.capacidad = capacidad
+        self.tasa = por_minuto / 60.0
+        self._local = threading.local()
+
+    def _conexion(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.ruta, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS limites ("
+                "clave TEXT PRIMARY KEY, fichas REAL NOT NULL, actualizado REAL NOT NULL)"
+            )
+            self._local.conn = conn
+        return conn
+
+    def consumir(self, clave, costo=1):
+        """Devuelve (permitido, segundos hasta que vuelva a haber fichas)."""
+        ahora = time.time()
+        try:
+            conn = self._conexion()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                fila = conn.execute(
+                    "SELECT fichas, actualizado FROM limites WHERE clave=?", (clave,)
+                ).fetchone()
+                if fila is None:
+                    fichas = self.capacidad
+                else:
+                    fichas = min(self.capacidad, fila[0] + max(0.0, ahora - fila[1]) * self.tasa)
+
+                permitido = fichas >= costo
+                if permitido:
+                    fichas -= costo
+                conn.execute(
+                    "INSERT INTO limites (clave, fichas, actualizado) VALUES (?, ?, ?) "
+                    "ON CONFLICT (clave) DO UPDATE SET fichas=excluded.fichas, actualizado=excluded.actualizado",
+                    (clave, fichas, ahora)
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        except sqlite3.Error as e:
+            print("ERROR LIMITES:", e)
+            return True, 0.0
+
+        return permitido, 0.0 if permitido else (costo - fichas) / self.tasa
+
+    def purgar(self):
+        """Borra las claves que ya se recargaron por completo (equivalen a no tener fila)."""
+        limite = time.time() - self.capacidad / self.tasa
+        conn = self._conexion()
+        conn.execute("DELETE FROM limites WHERE actualizado < ?", (limite,))
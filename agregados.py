@@ -0,0 +1,76 @@
+# ------------------- AGREGADOS -------------------
+#
+# Contadores por carrera y por dia de respuestas de la encuesta y examenes
+# generados, en la tabla resumen_diario (migracion 5 de esquema.py). Se
+# actualizan en la misma transaccion que cada INSERT, asi el tablero lee unas
+# pocas filas en lugar de hacer COUNT(*) sobre toda la tabla.
+#
+# Cada evento suma en dos filas: la del dia y la acumulada (dia = 'total').
+
+TOTAL = "total"
+
+_SUMAR = (
+    "INSERT INTO resumen_diario (dia, carrera, metrica, valor, cantidad) "
+    "SELECT {ph}, coalesce((SELECT carrera FROM usuarios WHERE expediente = {ph} LIMIT 1), ''), {ph}, {ph}, 1 "
+    "WHERE 1 = 1 "  # evita la ambiguedad INSERT ... SELECT ... ON CONFLICT en SQLite
+    "ON CONFLICT (dia, carrera, metrica, valor) "
+    "DO UPDATE SET cantidad = resumen_diario.cantidad + 1"
+)
+
+
+def sumar(execute_query, metrica, valor, expediente, fecha):
+    dia = fecha.strftime("%Y-%m-%d")
+    for clave in (dia, TOTAL):
+        execute_query(
+            _SUMAR.format(ph="?"),
+            _SUMAR.format(ph="%s"),
+            (clave, expediente, metrica, valor or "")
+        )
+
+
+def totales(execute_query, metrica, carrera=None):
+    """{valor: cantidad} acumulado, de una carrera o de todas."""
+    filtro_sqlite = " AND carrera = ?" if carrera else ""
+    filtro_pg = " AND carrera = %s" if carrera else ""
+    filas = execute_query(
+        "SELECT valor, SUM(cantidad) FROM resumen_diario WHERE dia = ? AND metrica = ?" + filtro_sqlite + " GROUP BY valor",
+        "SELECT valor, SUM(cantidad) FROM resumen_diario WHERE dia = %s AND metrica = %s" + filtro_pg + " GROUP BY valor",
+        (TOTAL, metrica) + ((carrera,) if carrera else ()),
+        fetchall=True
+    )
+    return {valor: int(cantidad) for valor, cantidad in filas}
+
+
+# (metrica, tabla, columna de valor) que se reconstruyen desde las tablas base
+_FUENTES = [
+    ("encuesta", "encuesta_salud", "t.respuesta"),
+    ("examen", "examenes", "''"),
+]
+
+
+def reconstruir(execute_query):
+    """Recalcula resumen_diario desde cero (para corregir desvios)."""
+    execute_query("DELETE FROM resumen_diario", "DELETE FROM resumen_diario")
+
+    for metrica, tabla, valor in _FUENTES:
+        for dia_sqlite, dia_pg in (
+            # Filas viejas sin fecha o con fecha mal formada solo cuentan en el total
+            (
+                "CASE WHEN t.fecha GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]*' "
+                "THEN substr(t.fecha, 1, 10) END",
+                "to_char(t.fecha, 'YYYY-MM-DD')",
+            ),
+            (f"'{TOTAL}'", f"'{TOTAL}'"),
+        ):
+            sql = (
+                "INSERT INTO resumen_diario (dia, carrera, metrica, valor, cantidad) "
+                "SELECT dia, carrera, '{metrica}', valor, COUNT(*) FROM ("
+                "SELECT {dia} AS dia, "
+                "coalesce((SELECT carrera FROM usuarios WHERE expediente = t.expediente LIMIT 1), '') AS carrera, "
+                "coalesce({valor}, '') AS valor FROM {tabla} t"
+                ") x WHERE dia IS NOT NULL GROUP BY dia, carrera, valor"
+            )
+            execute_query(
+                sql.format(dia=dia_sqlite, metrica=metrica, valor=valor, tabla=tabla),
+                sql.format(dia=dia_pg, metrica=metrica, valor=valor, tabla=tabla),
+            )
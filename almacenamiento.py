@@ -0,0 +1,361 @@
+import hashlib
+import io
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+# ------------------- FLUJOS DE SUBIDA -------------------
+#
+# El archivo que llega en request.files se manda al almacenamiento por bloques
+# directamente desde su stream, sin copiarlo antes a temp_pdfs/.
+
+TAM_BLOQUE = 64 * 1024
+FIRMA_PDF = b"%PDF-"
+
+
+class ArchivoNoPDF(ValueError):
+    pass
+
+
+class _FlujoConPrefijo(io.RawIOBase):
+    """Devuelve primero los bytes ya leidos y despues el resto del stream original."""
+
+    def __init__(self, prefijo, stream):
+        self._prefijo = prefijo
+        self._stream = stream
+
+    def readable(self):
+        return True
+
+    def readinto(self, destino):
+        if self._prefijo:
+            n = min(len(destino), len(self._prefijo))
+            destino[:n] = self._prefijo[:n]
+            self._prefijo = self._prefijo[n:]
+            return n
+
+        datos = self._stream.read(len(destino))
+        n = len(datos)
+        destino[:n] = datos
+        return n
+
+
+def abrir_pdf_validado(stream, tam_bloque=TAM_BLOQUE):
+    """Valida la firma %PDF- en el primer bloque y devuelve un lector por bloques.
+
+    El resultado es un io.BufferedReader, que es lo que acepta el cliente de
+    Supabase para subir desde un stream en lugar de una ruta.
+    """
+    primer_bloque = stream.read(tam_bloque)
+    # Algunos generadores anteponen basura; el estandar permite la firma en el primer KB
+    if FIRMA_PDF not in primer_bloque[:1024]:
+        raise ArchivoNoPDF("El archivo no es un PDF valido")
+    return io.BufferedReader(_FlujoConPrefijo(primer_bloque, stream), tam_bloque)
+
+
+def preparar_pdf(stream, tam_bloque=TAM_BLOQUE):
+    """Valida la firma y calcula SHA-256 y tamano en una pasada por bloques.
+
+    Devuelve (sha256, tamano, lector) con el lector al inicio del archivo, para
+    decidir con el hash si hace falta subirlo. Werkzeug ya guarda el cuerpo en
+    un archivo temporal; un stream que no se pueda rebobinar se copia a uno.
+    """
+    try:
+        rebobinable = stream.seekable()
+    except AttributeError:
+        rebobinable = False
+    if not rebobinable:
+        copia = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+        shutil.copyfileobj(stream, copia, tam_bloque)
+        copia.seek(0)
+        stream = copia
+
+    inicio = stream.tell()
+    huella = hashlib.sha256()
+    tamano = 0
+    while True:
+        bloque = stream.read(tam_bloque)
+        if not bloque:
+            break
+        huella.update(bloque)
+        tamano += len(bloque)
+    stream.seek(inicio)
+
+    return huella.hexdigest(), tamano, abrir_pdf_validado(stream, tam_bloque)
+
+
+# ------------------- BACKENDS -------------------
+#
+# Lo que la app necesita de un almacenamiento de archivos: subir por ruta
+# ("<expediente>/<archivo>"), leer el objeto o su tamano de vuelta, la URL
+# publica y URLs firmadas en lote.
+
+class ObjetoNoEncontrado(LookupError):
+    pass
+
+
+def _no_encontrado(error):
+    # StorageApiError de storage3 trae el estado HTTP; no se importa aqui
+    # para no cargar el cliente de Supabase con el modulo
+    return str(getattr(error, "status", "")) == "404" or "not found" in str(error).lower()
+
+
+class AlmacenSupabase:
+    """Bucket de Supabase Storage. obtener_cliente() se llama en cada operacion
+    para que el cliente se cree perezosamente en cada proceso."""
+
+    def __init__(self, obtener_cliente, url, bucket="pdfs"):
+        self.obtener_cliente = obtener_cliente
+        self.url = url
+        self.bucket = bucket
+
+    def subir(self, ruta, contenido, tipo="application/pdf", sobrescribir=False):
+        """contenido: bytes o un lector por bloques (io.BufferedReader)."""
+        opciones = {"content-type": tipo}
+        if sobrescribir:
+            opciones["upsert"] = "true"
+        self.obtener_cliente().storage.from_(self.bucket).upload(ruta, contenido, opciones)
+
+    def descargar(self, ruta):
+        try:
+            return self.obtener_cliente().storage.from_(self.bucket).download(ruta)
+        except Exception as e:
+            if _no_encontrado(e):
+                raise ObjetoNoEncontrado(ruta) from e
+            raise
+
+    def tamano(self, ruta):
+        """Bytes del objeto sin descargarlo, o None si no existe."""
+        try:
+            datos = self.obtener_cliente().storage.from_(self.bucket).info(ruta)
+        except Exception as e:
+            if _no_encontrado(e):
+                return None
+            raise
+        tamano = datos.get("size")
+        if tamano is None:
+            tamano = (datos.get("metadata") or {}).get("size")
+        return int(tamano) if tamano is not None else len(self.descargar(ruta))
+
+    def url_publica(self, ruta):
+        return f"{self.url}/storage/v1/object/public/{self.bucket}/{ruta}"
+
+    def firmar_lote(self, rutas, segundos):
+        respuesta = self.obtener_cliente().storage.from_(self.bucket).create_signed_urls(rutas, segundos)
+        return {r["path"]: r["signedURL"] for r in respuesta if not r.get("error")}
+
+    def borrar(self, rutas):
+        self.obtener_cliente().storage.from_(self.bucket).remove(list(rutas))
+
+
+class AlmacenLocal:
+    """Imita al bucket en una carpeta local, para medir la app sin tocar Supabase.
+
+    latencia y variacion (segundos) se esperan en cada llamada para simular la
+    red; las URLs apuntan a url_base, que la app sirve desde la carpeta.
+    """
+
+    def __init__(self, carpeta, url_base, latencia=0.0, variacion=0.0):
+        self.carpeta = os.path.abspath(carpeta)
+        self.url_base = url_base.rstrip("/")
+        self.latencia = latencia
+        self.variacion = variacion
+
+    def _esperar(self):
+        if self.latencia or self.variacion:
+            time.sleep(self.latencia + random.uniform(0, self.variacion))
+
+    def ruta_en_disco(self, ruta):
+        destino = os.path.abspath(os.path.join(self.carpeta, ruta))
+        if not destino.startswith(self.carpeta + os.sep):
+            raise ValueError(f"Ruta fuera del almacen: {ruta}")
+        return destino
+
+    def subir(self, ruta, contenido, tipo="application/pdf", sobrescribir=False):
+        self._esperar()
+        destino = self.ruta_en_disco(ruta)
+        os.makedirs(os.path.dirname(destino), exist_ok=True)
+
+        parcial = f"{destino}.{os.getpid()}.{threading.get_ident()}.parcial"
+        try:
+            with open(parcial, "wb") as f:
+                if isinstance(contenido, (bytes, bytearray)):
+                    f.write(contenido)
+                else:
+                    shutil.copyfileobj(contenido, f, TAM_BLOQUE)
+            if sobrescribir:
+                os.replace(parcial, destino)
+            else:
+                # Como Supabase sin upsert: falla si ya existe (link es atomico)
+                os.link(parcial, destino)
+        finally:
+            if os.path.exists(parcial):
+                os.remove(parcial)
+
+    def descargar(self, ruta):
+        self._esperar()
+        try:
+            with open(self.ruta_en_disco(ruta), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            raise ObjetoNoEncontrado(ruta) from None
+
+    def tamano(self, ruta):
+        self._esperar()
+        try:
+            return os.path.getsize(self.ruta_en_disco(ruta))
+        except FileNotFoundError:
+            return None
+
+    def url_publica(self, ruta):
+        return f"{self.url_base}/{ruta}"
+
+    def firmar_lote(self, rutas, segundos):
+        self._esperar()
+        expira = int(time.time()) + segundos
+        return {ruta: f"{self.url_publica(ruta)}?expira={expira}" for ruta in rutas}
+
+    def borrar(self, rutas):
+        self._esperar()
+        for ruta in rutas:
+            try:
+                os.remove(self.ruta_en_disco(ruta))
+            except FileNotFoundError:
+                pass
+
+
+# ------------------- CACHES -------------------
+
+class CacheTTL:
+    """Cache thread-safe con caducidad por entrada y desalojo LRU."""
+
+    def __init__(self, capacidad=1024, ttl=60):
+        self.capacidad = capacidad
+        self.ttl = ttl
+        self._datos = OrderedDict()  # clave -> (valor, caduca_en, creado_en)
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+
+    def obtener(self, clave, valido_desde=0):
+        """Devuelve el valor o None. valido_desde descarta entradas mas viejas."""
+        ahora = time.time()
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is None or entrada[1] <= ahora or entrada[2] < valido_desde:
+                if entrada is not None:
+                    del self._datos[clave]
+                self.fallos += 1
+                return None
+            self._datos.move_to_end(clave)
+            self.aciertos += 1
+            return entrada[0]
+
+    def guardar(self, clave, valor, ttl=None):
+        ahora = time.time()
+        with self._lock:
+            self._datos[clave] = (valor, ahora + (self.ttl if ttl is None else ttl), ahora)
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.capacidad:
+                self._datos.popitem(last=False)
+
+    def invalidar(self, clave):
+        with self._lock:
+            self._datos.pop(clave, None)
+
+
+class URLsFirmadas:
+    """URLs firmadas de tiempo limitado, reutilizadas hasta poco antes de caducar.
+
+    firmar_lote(rutas, segundos) -> {ruta: url}; se llama una sola vez por
+    pagina con todas las rutas que no estan en cache.
+    """
+
+    def __init__(self, firmar_lote, duracion=3600, margen=300, capacidad=4096):
+        self.firmar_lote = firmar_lote
+        self.duracion = duracion
+        self.margen = margen
+        self.cache = CacheTTL(capacidad, ttl=duracion - margen)
+
+    def obtener(self, rutas):
+        urls, faltantes = {}, []
+        for ruta in rutas:
+            url = self.cache.obtener(ruta)
+            if url is None:
+                faltantes.append(ruta)
+            else:
+                urls[ruta] = url
+
+        if faltantes:
+            for ruta, url in self.firmar_lote(faltantes, self.duracion).items():
+                if url:
+                    self.cache.guardar(ruta, url)
+                    urls[ruta] = url
+        return urls
+
+
+# ------------------- CONSERJE -------------------
+#
+# Borra periodicamente los archivos que quedaron huerfanos en carpetas de
+# trabajo (temp_pdfs/) por errores o procesos que murieron a medias. Solo se
+# le deben pasar carpetas cuyos archivos ninguna fila referencia.
+
+def limpiar_huerfanos(carpetas, edad_max):
+    limite = time.time() - edad_max
+    borrados = []
+
+    for carpeta in carpetas:
+        if not os.path.isdir(carpeta):
+            continue
+        for nombre in os.listdir(carpeta):
+            ruta = os.path.join(carpeta, nombre)
+            try:
+                if os.path.isfile(ruta) and os.path.getmtime(ruta) < limite:
+                    os.remove(ruta)
+                    borrados.append(ruta)
+            except OSError:
+                pass  # otro proceso lo borro o lo esta usando
+
+    return borrados
+
+
+class Conserje:
+    def __init__(self, carpetas, edad_max=3600, intervalo=900, tareas=()):
+        self.carpetas = carpetas
+        self.edad_max = edad_max
+        self.intervalo = intervalo
+        self.tareas = list(tareas)  # funciones extra que se corren en cada vuelta
+        self._lock = threading.Lock()
+        self._hilo = None
+        self._pid = None
+        self._detener = threading.Event()
+
+    def iniciar(self):
+        if self.intervalo <= 0:
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._hilo is not None and self._hilo.is_alive():
+                return
+            self._pid = os.getpid()
+            self._detener.clear()
+            self._hilo = threading.Thread(target=self._bucle, name="conserje", daemon=True)
+            self._hilo.start()
+
+    def detener(self):
+        self._detener.set()
+
+    def _bucle(self):
+        while not self._detener.is_set():
+            borrados = limpiar_huerfanos(self.carpetas, self.edad_max)
+            if borrados:
+                print(f"CONSERJE: {len(borrados)} archivos huerfanos borrados")
+            for tarea in self.tareas:
+                try:
+                    tarea()
+                except Exception as e:
+                    print(f"ERROR CONSERJE ({tarea.__name__}):", e)
+            self._detener.wait(self.intervalo)
@@ -0,0 +1,160 @@
+"""Tiempo de arranque en frio de la app y de gunicorn.
+
+Uso:
+    python benchmarks/bench_arranque.py [--repeticiones 5] [--workers 2]
+
+Mide, cada vez en un interprete nuevo:
+  - import app (lo que paga cada worker antes de poder atender),
+  - lo que costaban supabase y fpdf cuando se importaban con la app (ahora
+    se cargan con el primer uso),
+  - preparar_proceso() con una base vacia (migraciones) y con una ya migrada,
+  - gunicorn -c gunicorn.conf.py: desde el arranque hasta que /listo responde
+    200, y la primera peticion contra las siguientes.
+
+Usa una base SQLite temporal y ALMACEN=local; no toca serviciomed.db.
+"""
+import argparse
+import http.client
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MEDIR_IMPORT = """
+import json, time
+t = time.perf_counter()
+import app
+importar = time.perf_counter() - t
+t = time.perf_counter()
+app.preparar_proceso()
+preparar = time.perf_counter() - t
+print(json.dumps({"importar": importar, "preparar": preparar}))
+"""
+
+MEDIR_DIFERIDOS = """
+import json, time
+t = time.perf_counter()
+from supabase import create_client
+create_client("https://ejemplo.supabase.co", "x" * 40)
+supabase = time.perf_counter() - t
+t = time.perf_counter()
+import fpdf
+print(json.dumps({"supabase": supabase, "fpdf": time.perf_counter() - t}))
+"""
+
+
+def entorno(carpeta, base):
+    datos = dict(
+        os.environ,
+        SQLITE_PATH=os.path.join(carpeta, base),
+        TRABAJOS_DB=os.path.join(carpeta, "trabajos.db"),
+        ALMACEN="local",
+        ALMACEN_LOCAL_DIR=os.path.join(carpeta, "almacen"),
+        CONSERJE_INTERVALO="0",
+        TRABAJOS_EN_PROCESO="0",
+        GUNICORN_ACCESSLOG="",
+    )
+    datos.pop("DATABASE_URL", None)
+    return datos
+
+
+def correr(script, env):
+    salida = subprocess.run(
+        [sys.executable, "-c", script], cwd=RAIZ, env=env, capture_output=True, text=True, check=True
+    )
+    return json.loads(salida.stdout.strip().splitlines()[-1])
+
+
+def puerto_libre():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def pedir(puerto, ruta):
+    conn = http.client.HTTPConnection("127.0.0.1", puerto, timeout=30)
+    inicio = time.perf_counter()
+    conn.request("GET", ruta)
+    respuesta = conn.getresponse()
+    respuesta.read()
+    return respuesta.status, time.perf_counter() - inicio
+
+
+def medir_gunicorn(carpeta, workers):
+    puerto = puerto_libre()
+    inicio = time.perf_counter()
+    proceso = subprocess.Popen(
+        [
+            sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "wsgi:app",
+            "--workers", str(workers), "--bind", f"127.0.0.1:{puerto}", "--log-level", "warning",
+        ],
+        cwd=RAIZ,
+        env=entorno(carpeta, "gunicorn.db"),
+    )
+    try:
+        while True:
+            if proceso.poll() is not None:
+                raise RuntimeError("gunicorn termino antes de estar listo")
+            if time.perf_counter() - inicio > 60:
+                raise RuntimeError("gunicorn no estuvo listo en 60s")
+            try:
+                if pedir(puerto, "/listo")[0] == 200:
+                    break
+            except OSError:
+                time.sleep(0.05)
+        listo = time.perf_counter() - inicio
+
+        # La primera compila la plantilla en el worker que la atiende
+        primera = pedir(puerto, "/login")[1]
+        siguientes = statistics.median(pedir(puerto, "/login")[1] for _ in range(20))
+        return listo, primera, siguientes
+    finally:
+        proceso.terminate()
+        proceso.wait(30)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=2)
+    args = parser.parse_args()
+
+    importar, vacia, migrada, supabase, fpdf, listo, primera, siguientes = ([] for _ in range(8))
+    for _ in range(args.repeticiones):
+        with tempfile.TemporaryDirectory() as carpeta:
+            env = entorno(carpeta, "arranque.db")
+            datos = correr(MEDIR_IMPORT, env)           # base vacia: aplica migraciones
+            importar.append(datos["importar"])
+            vacia.append(datos["preparar"])
+            migrada.append(correr(MEDIR_IMPORT, env)["preparar"])
+
+            datos = correr(MEDIR_DIFERIDOS, env)
+            supabase.append(datos["supabase"])
+            fpdf.append(datos["fpdf"])
+
+            for lista, valor in zip((listo, primera, siguientes), medir_gunicorn(carpeta, args.workers)):
+                lista.append(valor)
+
+    def ms(valores):
+        return f"{statistics.median(valores) * 1000:9.1f}"
+
+    print(f"mediana de {args.repeticiones} arranques en frio\n")
+    print(f"{'fase':52} {'ms':>9}")
+    print(f"{'import app':52} {ms(importar)}")
+    print(f"{'  (antes tambien) import supabase + create_client':52} {ms(supabase)}")
+    print(f"{'  (antes tambien) import fpdf':52} {ms(fpdf)}")
+    print(f"{'preparar_proceso, base vacia (migraciones)':52} {ms(vacia)}")
+    print(f"{'preparar_proceso, base al dia':52} {ms(migrada)}")
+    print(f"{f'gunicorn {args.workers} workers hasta /listo 200':52} {ms(listo)}")
+    print(f"{'primera peticion':52} {ms(primera)}")
+    print(f"{'peticiones siguientes':52} {ms(siguientes)}")
+
+
+if __name__ == "__main__":
+    main()
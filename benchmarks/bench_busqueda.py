@@ -0,0 +1,140 @@
+"""Latencia p50/p99 de la busqueda de expedientes con 100k alumnos.
+
+Uso:
+    python benchmarks/bench_busqueda.py [--alumnos 100000] [--busquedas 300]
+
+Compara busqueda.buscar (FTS5 trigram + keyset, una sola consulta con
+encuesta y examenes) contra el enfoque ingenuo: LIKE '%...%' sobre usuarios
+y dos consultas extra por alumno encontrado (N+1). Usa una base SQLite
+temporal; no toca serviciomed.db.
+"""
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import busqueda  # noqa: E402
+from esquema import aplicar_migraciones  # noqa: E402
+
+NOMBRES = ["Ana", "Luis", "María", "José", "Fernanda", "Carlos", "Lucía", "Jorge", "Valeria", "Miguel",
+           "Sofía", "Diego", "Camila", "Andrés", "Paola", "Ricardo", "Daniela", "Emilio", "Regina", "Tomás"]
+APELLIDOS = ["García", "Hernández", "López", "Martínez", "González", "Pérez", "Rodríguez", "Sánchez",
+             "Ramírez", "Cruz", "Flores", "Gómez", "Morales", "Vázquez", "Jiménez", "Reyes", "Díaz",
+             "Torres", "Gutiérrez", "Ruiz", "Mendoza", "Aguilar", "Ortiz", "Castillo", "Romero"]
+CARRERAS = {
+    "Ingeniería en Sistemas Computacionales": "ISC",
+    "Ingeniería Industrial": "II",
+    "Ingeniería en Mecatrónica": "IM",
+    "Ingeniería Química": "IQ",
+    "Licenciatura en Administración": "LA",
+    "Licenciatura en Gastronomía": "LG",
+}
+
+
+def sembrar(conn, alumnos):
+    aplicar_migraciones(conn, False, hasta=3)
+    usuarios, encuestas, examenes = [], [], []
+    carreras = list(CARRERAS.items())
+    for a in range(alumnos):
+        carrera, prefijo = carreras[a % len(carreras)]
+        expediente = f"{prefijo}{a // len(carreras) + 1:05d}"
+        nombre = f"{random.choice(NOMBRES)} {random.choice(APELLIDOS)} {random.choice(APELLIDOS)}"
+        usuarios.append((nombre, "pw", carrera, expediente))
+        encuestas.append((expediente, random.choice(("Si", "No"))))
+        examenes.append((expediente, nombre, "19", carrera, f"{expediente}_examen.pdf", "listo"))
+    conn.executemany("INSERT INTO usuarios (nombre,password,carrera,expediente) VALUES (?,?,?,?)", usuarios)
+    conn.executemany("INSERT INTO encuesta_salud (expediente,respuesta) VALUES (?,?)", encuestas)
+    conn.executemany(
+        "INSERT INTO examenes (expediente,nombre,edad,carrera,documento,estado) VALUES (?,?,?,?,?,?)", examenes
+    )
+    conn.commit()
+    return [u[0] for u in usuarios]
+
+
+def consultas_de_prueba(nombres, n):
+    consultas = []
+    for _ in range(n):
+        tipo = random.randrange(4)
+        if tipo == 0:
+            consultas.append(f"{random.choice(list(CARRERAS.values()))}{random.randrange(1, 9999):05d}")
+        elif tipo == 1:
+            consultas.append(random.choice(nombres).split()[1])           # apellido
+        elif tipo == 2:
+            nombre = random.choice(nombres).split()[0]
+            consultas.append(nombre[:-1] + "x" + nombre[-1])              # con error de dedo
+        else:
+            consultas.append(random.choice(list(CARRERAS.values()))[:2])  # prefijo corto
+    return consultas
+
+
+def buscar_ingenuo(conn, q):
+    patron = f"%{q}%"
+    usuarios = conn.execute(
+        "SELECT id, nombre, carrera, expediente FROM usuarios "
+        "WHERE expediente LIKE ? OR nombre LIKE ? OR carrera LIKE ? ORDER BY id LIMIT 20",
+        (patron, patron, patron)
+    ).fetchall()
+    for _, _, _, expediente in usuarios:
+        conn.execute("SELECT respuesta FROM encuesta_salud WHERE expediente=?", (expediente,)).fetchall()
+        conn.execute("SELECT * FROM examenes WHERE expediente=?", (expediente,)).fetchall()
+    return usuarios
+
+
+def percentiles(tiempos):
+    tiempos = sorted(tiempos)
+    return statistics.median(tiempos), tiempos[int(len(tiempos) * 0.99) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--alumnos", type=int, default=100_000)
+    parser.add_argument("--busquedas", type=int, default=300)
+    args = parser.parse_args()
+
+    random.seed(0)
+    with tempfile.TemporaryDirectory() as carpeta:
+        conn = sqlite3.connect(os.path.join(carpeta, "bench.db"))
+        inicio = time.perf_counter()
+        nombres = sembrar(conn, args.alumnos)
+        consultas = consultas_de_prueba(nombres, args.busquedas)
+
+        ingenuo = []
+        for q in consultas:
+            t = time.perf_counter()
+            buscar_ingenuo(conn, q)
+            ingenuo.append((time.perf_counter() - t) * 1000)
+
+        aplicar_migraciones(conn, False)
+        print(f"{args.alumnos} alumnos sembrados e indexados en {time.perf_counter() - inicio:.1f}s\n")
+
+        def ejecutar(sql, params):
+            return conn.execute(sql, params).fetchall()
+
+        indexado = []
+        for q in consultas:
+            t = time.perf_counter()
+            busqueda.buscar(q, ejecutar, False)
+            indexado.append((time.perf_counter() - t) * 1000)
+        conn.close()
+
+    # Los prefijos cortos van por otro camino (rangos B-tree), se reportan aparte
+    cortos = [i for i, q in enumerate(consultas) if busqueda.modo_inicial(q) == "prefijo"]
+    filas = [
+        ("LIKE %q% + N+1", ingenuo),
+        ("indice + consulta unica + keyset", indexado),
+        ("  solo prefijos cortos, LIKE", [ingenuo[i] for i in cortos]),
+        ("  solo prefijos cortos, indice", [indexado[i] for i in cortos]),
+    ]
+    print(f"{'busqueda':38} {'p50 ms':>8} {'p99 ms':>8}")
+    for nombre, tiempos in filas:
+        print(f"{nombre:38} {percentiles(tiempos)[0]:8.2f} {percentiles(tiempos)[1]:8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,315 @@
+"""Prueba de carga del flujo completo del alumno contra gunicorn.
+
+Uso:
+    python benchmarks/bench_carga.py [--usuarios 20] [--rondas 3] [--workers 2] [--hilos 4]
+                                     [--latencia-ms 80] [--variacion-ms 40] [--pdf-kb 100]
+    python benchmarks/bench_carga.py --url http://127.0.0.1:8000   # servidor ya levantado
+
+Cada usuario simulado se registra y despues repite --rondas veces
+login -> encuesta -> examen -> subir_pdf -> mis_documentos -> logout, cargando
+cada formulario antes de enviarlo. Levanta gunicorn con una base SQLite
+temporal y ALMACEN=local (con la latencia de red indicada), asi que no toca
+serviciomed.db ni Supabase.
+
+Reporta req/s y p50/p95/p99 por ruta, y cuanto tarda la cola en dejar listos
+los examenes encolados durante la prueba. Los 503 y 429 de la admision se
+cuentan aparte: son rechazos previstos, no errores de la app.
+"""
+import argparse
+import http.client
+import os
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import defaultdict
+from urllib.parse import urlencode, urlsplit
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from esquema import aplicar_migraciones  # noqa: E402
+
+CARRERAS = [
+    "Ingeniería en Sistemas Computacionales",
+    "Ingeniería Industrial",
+    "Ingeniería en Mecatrónica",
+    "Ingeniería Química",
+    "Licenciatura en Administración",
+    "Licenciatura en Gastronomía",
+]
+
+# Las respuestas del examen medico; los campos libres van con texto corto
+CAMPOS_EXAMEN = [
+    "aparato_auditivo", "carrera_tecnica", "consumo", "deporte", "discapacidad", "enf_oidos",
+    "enf_ojos", "enfermedad_actual", "hermanos_adicciones", "hermanos_alcoholismo",
+    "hermanos_tabaquismo", "lentes", "madre_adicciones", "madre_alcoholismo", "madre_tabaquismo",
+    "operado", "padre_adicciones", "padre_alcoholismo", "padre_tabaquismo", "tratamiento", "vacunas",
+]
+TEXTOS_EXAMEN = {
+    "domicilio": "Av. Universidad 123, Col. Centro", "escolaridad": "Bachillerato",
+    "escuela_procedencia": "CBTis 1", "estado_civil": "Soltero", "estatura": "1.70",
+    "grupo_sanguineo": "O", "rh": "+", "lugar_nacimiento": "Querétaro", "ocupacion": "Estudiante",
+    "peso": "65", "promedio_bachillerato": "8.9", "religion": "Ninguna",
+    "telefono_domicilio": "4420000000", "telefono_familiar": "4420000001",
+    "telefono_mama": "4420000002", "telefono_papa": "4420000003",
+    "enfermedades": "Ninguna",
+}
+
+
+def pdf_de_prueba(kb):
+    cuerpo = b"%PDF-1.4\n%" + b"x" * max(0, kb * 1024 - 20) + b"\n%%EOF\n"
+    return cuerpo
+
+
+def multipart(campo, nombre, contenido):
+    limite = uuid.uuid4().hex
+    cuerpo = (
+        f"--{limite}\r\n"
+        f'Content-Disposition: form-data; name="{campo}"; filename="{nombre}"\r\n'
+        "Content-Type: application/pdf\r\n\r\n"
+    ).encode() + contenido + f"\r\n--{limite}--\r\n".encode()
+    return cuerpo, f"multipart/form-data; boundary={limite}"
+
+
+class Usuario:
+    """Un alumno con su propia conexion keep-alive y su cookie de sesion."""
+
+    def __init__(self, host, puerto, resultados, errores, rechazos, lock):
+        self.host, self.puerto = host, puerto
+        self.resultados, self.errores, self.rechazos, self.lock = resultados, errores, rechazos, lock
+        self.conn = None
+        self.cookie = None
+
+    def pedir(self, metodo, ruta, datos=None, cuerpo=None, tipo=None, esperado=None):
+        headers = {}
+        if self.cookie:
+            headers["Cookie"] = self.cookie
+        if datos is not None:
+            cuerpo, tipo = urlencode(datos).encode(), "application/x-www-form-urlencoded"
+        if cuerpo is not None:
+            headers["Content-Type"] = tipo
+
+        clave = f"{metodo} {ruta.split('?')[0]}"
+        inicio = time.perf_counter()
+        try:
+            if self.conn is None:
+                self.conn = http.client.HTTPConnection(self.host, self.puerto, timeout=120)
+            self.conn.request(metodo, ruta, body=cuerpo, headers=headers)
+            respuesta = self.conn.getresponse()
+            respuesta.read()
+            estado = respuesta.status
+            cookie = respuesta.getheader("Set-Cookie")
+            if cookie:
+                self.cookie = cookie.split(";", 1)[0]
+        except (OSError, http.client.HTTPException):
+            self.conn = None
+            estado = None
+        duracion = time.perf_counter() - inicio
+
+        esperado = esperado or (302 if metodo == "POST" else 200)
+        with self.lock:
+            self.resultados[clave].append(duracion)
+            if estado in (503, 429):
+                self.rechazos[clave, estado] += 1
+            elif estado != esperado:
+                self.errores[clave] += 1
+        return estado
+
+    def registrarse(self, nombre, password, carrera):
+        self.pedir("GET", "/")
+        self.pedir("POST", "/", {"nombre": nombre, "password": password, "carrera": carrera})
+
+    def ronda(self, nombre, password, carrera, pdf):
+        self.pedir("GET", "/login")
+        self.pedir("POST", "/login", {"nombre": nombre, "password": password})
+
+        self.pedir("GET", "/encuesta")
+        self.pedir("POST", "/encuesta", {"respuesta": "Si"})
+
+        self.pedir("GET", "/examen")
+        examen = dict.fromkeys(CAMPOS_EXAMEN, "No")
+        examen.update(TEXTOS_EXAMEN, nombre=nombre, edad="19", carrera=carrera)
+        self.pedir("POST", "/examen", examen)
+
+        self.pedir("GET", "/subir_pdf")
+        cuerpo, tipo = multipart("archivo", "comprobante.pdf", pdf)
+        self.pedir("POST", "/subir_pdf", cuerpo=cuerpo, tipo=tipo)
+
+        self.pedir("GET", "/mis_documentos")
+        self.pedir("GET", "/logout", esperado=302)
+
+
+def puerto_libre():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def esperar_servidor(host, puerto, proceso, timeout=60):
+    limite = time.time() + timeout
+    while time.time() < limite:
+        if proceso is not None and proceso.poll() is not None:
+            raise RuntimeError("gunicorn termino antes de responder")
+        try:
+            conn = http.client.HTTPConnection(host, puerto, timeout=2)
+            conn.request("GET", "/listo")
+            if conn.getresponse().status == 200:
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError("gunicorn no respondio a tiempo")
+
+
+def levantar_gunicorn(carpeta, args):
+    base = os.path.join(carpeta, "carga.db")
+    conn = sqlite3.connect(base)
+    aplicar_migraciones(conn, False)
+    conn.close()
+
+    puerto = puerto_libre()
+    entorno = dict(
+        os.environ,
+        SQLITE_PATH=base,
+        TRABAJOS_DB=os.path.join(carpeta, "trabajos.db"),
+        ALMACEN="local",
+        ALMACEN_LOCAL_DIR=os.path.join(carpeta, "almacen"),
+        ALMACEN_LATENCIA_MS=str(args.latencia_ms),
+        ALMACEN_VARIACION_MS=str(args.variacion_ms),
+        CONSERJE_INTERVALO="0",
+        PETICION_LENTA_MS="0",
+        GUNICORN_THREADS=str(args.hilos),
+        GUNICORN_ACCESSLOG="",
+    )
+    entorno.pop("DATABASE_URL", None)
+    proceso = subprocess.Popen(
+        [
+            sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "wsgi:app",
+            "--workers", str(args.workers), "--threads", str(args.hilos),
+            "--bind", f"127.0.0.1:{puerto}", "--log-level", "warning",
+        ],
+        cwd=RAIZ,
+        env=entorno,
+    )
+    return proceso, puerto, base
+
+
+def esperar_cola(base, timeout=120):
+    inicio = time.perf_counter()
+    conn = sqlite3.connect(base)
+    try:
+        while time.perf_counter() - inicio < timeout:
+            pendientes, fallidos = conn.execute(
+                "SELECT SUM(estado = 'procesando'), SUM(estado = 'fallido') FROM examenes"
+            ).fetchone()
+            if not pendientes:
+                return time.perf_counter() - inicio, fallidos or 0
+            time.sleep(0.2)
+    finally:
+        conn.close()
+    return None, None
+
+
+def percentil(tiempos, q):
+    return tiempos[min(len(tiempos) - 1, int(q * len(tiempos)))]
+
+
+def reportar(resultados, errores, rechazos, duracion):
+    print(
+        f"{'ruta':24} {'n':>6} {'err':>5} {'503':>5} {'429':>5} {'req/s':>8} "
+        f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"
+    )
+    total = 0
+    for clave in sorted(resultados):
+        tiempos = sorted(resultados[clave])
+        total += len(tiempos)
+        print(
+            f"{clave:24} {len(tiempos):6d} {errores[clave]:5d} {rechazos[clave, 503]:5d} "
+            f"{rechazos[clave, 429]:5d} {len(tiempos) / duracion:8.1f} "
+            f"{percentil(tiempos, 0.5) * 1000:8.1f} {percentil(tiempos, 0.95) * 1000:8.1f} "
+            f"{percentil(tiempos, 0.99) * 1000:8.1f}"
+        )
+    todos = sorted(t for tiempos in resultados.values() for t in tiempos)
+    print(
+        f"{'TOTAL':24} {total:6d} {sum(errores.values()):5d} "
+        f"{sum(n for (_, estado), n in rechazos.items() if estado == 503):5d} "
+        f"{sum(n for (_, estado), n in rechazos.items() if estado == 429):5d} {total / duracion:8.1f} "
+        f"{percentil(todos, 0.5) * 1000:8.1f} {percentil(todos, 0.95) * 1000:8.1f} "
+        f"{percentil(todos, 0.99) * 1000:8.1f}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--usuarios", type=int, default=20)
+    parser.add_argument("--rondas", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--hilos", type=int, default=4)
+    parser.add_argument("--latencia-ms", type=float, default=80)
+    parser.add_argument("--variacion-ms", type=float, default=40)
+    parser.add_argument("--pdf-kb", type=int, default=100)
+    parser.add_argument("--url", help="medir un servidor ya levantado en lugar de gunicorn temporal")
+    args = parser.parse_args()
+
+    resultados, errores, rechazos = defaultdict(list), defaultdict(int), defaultdict(int)
+    lock = threading.Lock()
+    pdf = pdf_de_prueba(args.pdf_kb)
+    corrida = uuid.uuid4().hex[:6]
+
+    with tempfile.TemporaryDirectory() as carpeta:
+        proceso, base = None, None
+        if args.url:
+            partes = urlsplit(args.url)
+            host, puerto = partes.hostname, partes.port or 80
+        else:
+            proceso, puerto, base = levantar_gunicorn(carpeta, args)
+            host = "127.0.0.1"
+
+        try:
+            esperar_servidor(host, puerto, proceso)
+            print(
+                f"{args.usuarios} usuarios x {args.rondas} rondas, "
+                f"almacen con {args.latencia_ms:.0f}+-{args.variacion_ms:.0f} ms"
+                + ("" if args.url else f", gunicorn {args.workers} workers x {args.hilos} hilos")
+                + "\n"
+            )
+
+            salida = threading.Barrier(args.usuarios + 1)
+
+            def simular(i):
+                usuario = Usuario(host, puerto, resultados, errores, rechazos, lock)
+                nombre, carrera = f"Carga {corrida} {i}", CARRERAS[i % len(CARRERAS)]
+                salida.wait()
+                usuario.registrarse(nombre, "pw", carrera)
+                for _ in range(args.rondas):
+                    usuario.ronda(nombre, "pw", carrera, pdf)
+
+            hilos = [threading.Thread(target=simular, args=(i,)) for i in range(args.usuarios)]
+            for hilo in hilos:
+                hilo.start()
+            salida.wait()
+            inicio = time.perf_counter()
+            for hilo in hilos:
+                hilo.join()
+            duracion = time.perf_counter() - inicio
+
+            reportar(resultados, errores, rechazos, duracion)
+            print(f"\n{duracion:.1f}s en total")
+            if base:
+                espera, fallidos = esperar_cola(base)
+                if espera is None:
+                    print("La cola no termino los examenes en 120s")
+                else:
+                    print(f"Cola vaciada {espera:.1f}s despues de la ultima peticion ({fallidos} examenes fallidos)")
+        finally:
+            if proceso is not None:
+                proceso.terminate()
+                proceso.wait(30)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""Tiempo por ruta de las consultas calientes, antes y despues de los indices.
+
+Uso:
+    python benchmarks/bench_indices.py [--alumnos 100000] [--repeticiones 200]
+
+Siembra una base SQLite temporal (no toca serviciomed.db) con el esquema base,
+mide las consultas que hace cada ruta, aplica las migraciones de esquema.py y
+vuelve a medir.
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from esquema import aplicar_migraciones  # noqa: E402
+
+CARRERAS = {
+    "Ingeniería en Sistemas Computacionales": "ISC",
+    "Ingeniería Industrial": "II",
+    "Ingeniería en Mecatrónica": "IM",
+    "Ingeniería Química": "IQ",
+    "Licenciatura en Administración": "LA",
+}
+
+# (ruta, consulta, generador de parametros)
+CONSULTAS = [
+    ("/login", "SELECT * FROM usuarios WHERE nombre=? AND password=?",
+     lambda a: (f"alumno{a}", f"pw{a}")),
+    ("/ registro: duplicado", "SELECT * FROM usuarios WHERE nombre=? AND carrera=?",
+     lambda a: (f"alumno{a}", random.choice(list(CARRERAS)))),
+    ("/ registro: ultimo expediente",
+     "SELECT expediente FROM usuarios WHERE carrera=? ORDER BY expediente DESC LIMIT 1",
+     lambda a: (random.choice(list(CARRERAS)),)),
+    ("/mis_documentos: documentos",
+     "SELECT nombre_original, url, fecha FROM documentos_subidos WHERE expediente=?",
+     lambda a: (f"ISC{a:06d}",)),
+    ("/mis_documentos: examenes",
+     "SELECT documento, url, fecha FROM examenes WHERE expediente=?",
+     lambda a: (f"ISC{a:06d}",)),
+    ("encuesta por expediente", "SELECT respuesta FROM encuesta_salud WHERE expediente=?",
+     lambda a: (f"ISC{a:06d}",)),
+]
+
+
+def sembrar(conn, alumnos):
+    aplicar_migraciones(conn, False, hasta=1)
+    carreras = list(CARRERAS.items())
+    usuarios, encuestas, examenes, documentos = [], [], [], []
+
+    for a in range(alumnos):
+        carrera, prefijo = carreras[a % len(carreras)]
+        expediente = f"{prefijo}{a:06d}"
+        usuarios.append((f"alumno{a}", f"pw{a}", carrera, expediente))
+        encuestas.append((expediente, random.choice(("si", "no"))))
+        examenes.append((expediente, f"{expediente}_examen.pdf", "2026-01-18 12:00:00", "https://x"))
+        documentos.append((expediente, f"{expediente}_doc.pdf", "doc.pdf", "2026-01-18 12:00:00", "https://x"))
+
+    conn.executemany("INSERT INTO usuarios (nombre,password,carrera,expediente) VALUES (?,?,?,?)", usuarios)
+    conn.executemany("INSERT INTO encuesta_salud (expediente,respuesta) VALUES (?,?)", encuestas)
+    conn.executemany("INSERT INTO examenes (expediente,documento,fecha,url) VALUES (?,?,?,?)", examenes)
+    conn.executemany(
+        "INSERT INTO documentos_subidos (expediente,nombre_archivo,nombre_original,fecha,url) VALUES (?,?,?,?,?)",
+        documentos
+    )
+    conn.commit()
+
+
+def medir(conn, alumnos, repeticiones):
+    resultados = {}
+    for ruta, sql, parametros in CONSULTAS:
+        inicio = time.perf_counter()
+        for _ in range(repeticiones):
+            conn.execute(sql, parametros(random.randrange(alumnos))).fetchall()
+        resultados[ruta] = (time.perf_counter() - inicio) / repeticiones * 1000
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--alumnos", type=int, default=100_000)
+    parser.add_argument("--repeticiones", type=int, default=200)
+    args = parser.parse_args()
+
+    random.seed(0)
+    with tempfile.TemporaryDirectory() as carpeta:
+        conn = sqlite3.connect(os.path.join(carpeta, "bench.db"))
+
+        inicio = time.perf_counter()
+        sembrar(conn, args.alumnos)
+        print(f"Sembrados {args.alumnos} alumnos en {time.perf_counter() - inicio:.1f}s\n")
+
+        antes = medir(conn, args.alumnos, args.repeticiones)
+        aplicar_migraciones(conn, False)
+        despues = medir(conn, args.alumnos, args.repeticiones)
+        conn.close()
+
+    print(f"{'consulta':34} {'antes ms':>10} {'despues ms':>11} {'mejora':>8}")
+    for ruta in antes:
+        print(f"{ruta:34} {antes[ruta]:10.3f} {despues[ruta]:11.3f} {antes[ruta] / despues[ruta]:7.0f}x")
+
+
+if __name__ == "__main__":
+    main()
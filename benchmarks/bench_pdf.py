@@ -0,0 +1,115 @@
+"""ms/PDF y memoria pico del render del examen, individual y en lote.
+
+Uso:
+    python benchmarks/bench_pdf.py [--examenes 200] [--procesos 4]
+
+Compara el render anterior (FPDF nuevo + multi_cell por campo + archivo en
+examenes/ que se vuelve a leer) con pdf_examen.renderizar_examen en memoria.
+Los tiempos se toman sin tracemalloc; la memoria pico sale de otra pasada.
+"""
+import argparse
+import os
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fpdf import FPDF  # noqa: E402
+
+from pdf_examen import renderizar_examen, renderizar_lote  # noqa: E402
+
+
+def formulario_de_prueba(i):
+    formulario = {
+        "nombre": f"Alumno de Prueba {i}",
+        "edad": "19",
+        "estado_civil": "Soltero",
+        "lugar_nacimiento": "Toluca, Estado de México",
+        "domicilio": "Calle Independencia 123, Col. Centro, entre Hidalgo y Morelos, " * 2,
+        "carrera": "Ingeniería en Sistemas Computacionales",
+        "enfermedades": "Ninguna",
+        "expediente": f"ISC{i:04d}",
+        "fecha": "18/01/2026 14:08",
+    }
+    for n in range(40):
+        formulario[f"pregunta_{n}"] = "No"
+    return formulario
+
+
+def render_anterior(formulario, carpeta):
+    pdf = FPDF()
+    pdf.set_margins(12, 12, 12)
+    pdf.add_page()
+    pdf.set_auto_page_break(auto=True, margin=12)
+    ancho = pdf.w - pdf.l_margin - pdf.r_margin
+    pdf.set_font("Helvetica", "B", 13)
+    pdf.cell(0, 8, "EXAMEN MEDICO 2025-2", new_x="LMARGIN", new_y="NEXT", align="C")
+    pdf.ln(4)
+    pdf.set_font("Helvetica", size=9)
+    for campo, valor in formulario.items():
+        pdf.multi_cell(ancho, 5, f"{campo.replace('_', ' ').capitalize()}: {valor}")
+        pdf.ln(1)
+    ruta = os.path.join(carpeta, f"{formulario['expediente']}.pdf")
+    pdf.output(ruta)
+    with open(ruta, "rb") as f:
+        contenido = f.read()
+    os.remove(ruta)
+    return contenido
+
+
+def medir_tiempo(funcion, formularios):
+    inicio = time.perf_counter()
+    for formulario in formularios:
+        funcion(formulario)
+    return (time.perf_counter() - inicio) / len(formularios) * 1000
+
+
+def medir_memoria(funcion, formularios):
+    # Pasada aparte: tracemalloc hace varias veces mas lento a Python
+    tracemalloc.start()
+    for formulario in formularios:
+        funcion(formulario)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return pico / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--examenes", type=int, default=200)
+    parser.add_argument("--procesos", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    formularios = [formulario_de_prueba(i) for i in range(args.examenes)]
+    renderizar_examen(formularios[0])  # calentar la plantilla
+
+    with tempfile.TemporaryDirectory() as carpeta:
+        anterior = lambda f: render_anterior(f, carpeta)  # noqa: E731
+        ms_ant = medir_tiempo(anterior, formularios)
+        kb_ant = medir_memoria(anterior, formularios)
+    ms_nuevo = medir_tiempo(renderizar_examen, formularios)
+    kb_nuevo = medir_memoria(renderizar_examen, formularios)
+
+    inicio = time.perf_counter()
+    renderizar_lote(formularios, procesos=args.procesos)
+    ms_lote = (time.perf_counter() - inicio) / len(formularios) * 1000
+
+    # Con un proceso renderizar_lote no levanta el pool: es el mismo render en serie
+    if args.procesos == 1 or args.examenes <= 1:
+        modo_lote, memoria_lote = "lote, en serie (sin pool)", "-"
+    else:
+        rss_hijos = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+        modo_lote, memoria_lote = f"lote, pool de {args.procesos} procesos", f"{rss_hijos:.0f} MB RSS/proceso"
+
+    print(f"{args.examenes} examenes, {len(renderizar_examen(formularios[0])) / 1024:.1f} KB por PDF\n")
+    print(f"{'modo':32} {'ms/PDF':>8} {'memoria pico':>14}")
+    print(f"{'anterior (archivo + multi_cell)':32} {ms_ant:8.2f} {kb_ant:11.0f} KB")
+    print(f"{'en memoria, plantilla cacheada':32} {ms_nuevo:8.2f} {kb_nuevo:11.0f} KB")
+    print(f"{modo_lote:32} {ms_lote:8.2f} {memoria_lote:>14}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""Bytes enviados y tiempo de render de las paginas, antes y despues de
+comprimir, versionar static/ y precompilar las plantillas.
+
+Uso:
+    python benchmarks/bench_respuestas.py [--repeticiones 200] [--arranques 5]
+
+Mide:
+  - bytes del cuerpo de cada pagina sin comprimir (como antes), con gzip y
+    con br, y los de la revisita con If-None-Match (304 sin cuerpo solo en
+    las paginas fijas y static/; las del alumno se vuelven a mandar),
+  - los mismos bytes para static/ANNY.jpg y su Cache-Control,
+  - la primera vez que se renderiza examen.html en un proceso nuevo: sin
+    bytecode en disco (como antes), con el bytecode de un arranque anterior y
+    despues de preparar_proceso() (lo que ve la primera peticion del worker),
+  - el tiempo por peticion ya en caliente con COMPRIMIR_RESPUESTAS=0 y =1, y
+    lo que costaba renderizar login/registro en cada visita.
+
+Usa una base SQLite temporal y ALMACEN=local; no toca serviciomed.db.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Bytes por pagina y codificacion, y revisitas con el ETag recibido
+MEDIR_BYTES = """
+import app, json
+app.preparar_proceso()
+cliente = app.app.test_client()
+with cliente.session_transaction() as s:
+    s["usuario"] = "Bench Respuestas"
+    s["expediente"] = "II-0001"
+    s["rol"] = "alumno"
+with app.app.test_request_context():
+    from flask import url_for
+    imagen = url_for("static", filename="ANNY.jpg")
+
+datos = {}
+for nombre, ruta in [("registro", "/"), ("login", "/login"), ("examen", "/examen"),
+                     ("subir_pdf", "/subir_pdf"), ("ANNY.jpg", imagen)]:
+    fila = {}
+    for codificacion in ("identity", "gzip", "br"):
+        r = cliente.get(ruta, headers={"Accept-Encoding": codificacion})
+        fila[codificacion] = len(r.get_data())
+        etag = r.headers.get("ETag")
+        r.close()
+        if codificacion == "br":
+            r = cliente.get(ruta, headers={"Accept-Encoding": "br", "If-None-Match": etag})
+            fila["revisita"] = len(r.get_data())
+            fila["estado"] = r.status_code
+            fila["cache"] = r.headers.get("Cache-Control", "")
+            r.close()
+    datos[nombre] = fila
+print(json.dumps(datos))
+"""
+
+# Primera compilacion de examen.html en un interprete nuevo
+MEDIR_PRIMERA = """
+import json, sys, time
+import app
+if sys.argv[1] == "preparado":
+    app.preparar_proceso()
+with app.app.test_request_context():
+    t = time.perf_counter()
+    app.app.jinja_env.get_template("examen.html")
+    print(json.dumps({"primera": time.perf_counter() - t}))
+"""
+
+# Peticiones en caliente y render directo de las paginas fijas
+MEDIR_CALIENTE = """
+import json, sys, time, statistics
+import app
+from flask import render_template
+repeticiones = int(sys.argv[1])
+app.preparar_proceso()
+cliente = app.app.test_client()
+
+def mediana(funcion):
+    funcion()
+    tiempos = []
+    for _ in range(repeticiones):
+        t = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - t)
+    return statistics.median(tiempos)
+
+datos = {}
+for nombre, ruta in [("registro", "/"), ("login", "/login")]:
+    datos[nombre] = mediana(lambda: cliente.get(ruta, headers={"Accept-Encoding": "br, gzip"}).close())
+    with app.app.test_request_context(ruta):
+        datos[nombre + "_render"] = mediana(lambda: render_template(nombre + ".html"))
+print(json.dumps(datos))
+"""
+
+
+def entorno(carpeta, **extra):
+    datos = dict(
+        os.environ,
+        SQLITE_PATH=os.path.join(carpeta, "respuestas.db"),
+        TRABAJOS_DB=os.path.join(carpeta, "trabajos.db"),
+        LIMITES_DB=os.path.join(carpeta, "limites.db"),
+        ALMACEN="local",
+        ALMACEN_LOCAL_DIR=os.path.join(carpeta, "almacen"),
+        CACHE_ARCHIVOS=os.path.join(carpeta, "cache"),
+        CONSERJE_INTERVALO="0",
+        TRABAJOS_EN_PROCESO="0",
+        MIGRAR_AL_INICIAR="1",
+        PETICION_LENTA_MS="0",
+    )
+    datos.pop("DATABASE_URL", None)
+    datos.update(extra)
+    return datos
+
+
+def correr(script, env, *argumentos):
+    salida = subprocess.run(
+        [sys.executable, "-c", script, *map(str, argumentos)],
+        cwd=RAIZ, env=env, capture_output=True, text=True, check=True,
+    )
+    return json.loads(salida.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeticiones", type=int, default=200)
+    parser.add_argument("--arranques", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as carpeta:
+        env = entorno(carpeta)
+
+        print("bytes del cuerpo por respuesta\n")
+        print(f"{'pagina':12} {'antes':>8} {'gzip':>8} {'br':>8} {'ahorro':>7} {'revisita':>9}  cache")
+        for nombre, fila in correr(MEDIR_BYTES, env).items():
+            ahorro = 1 - fila["br"] / fila["identity"]
+            print(
+                f"{nombre:12} {fila['identity']:8d} {fila['gzip']:8d} {fila['br']:8d} {ahorro:6.0%} "
+                f"{fila['revisita']:5d} ({fila['estado']})  {fila['cache']}"
+            )
+
+        # Cada arranque con su propia carpeta de cache para empezar en frio
+        frio, tibio, preparado = [], [], []
+        for i in range(args.arranques):
+            env_arranque = entorno(carpeta, CACHE_ARCHIVOS=os.path.join(carpeta, f"cache{i}"))
+            os.makedirs(os.path.join(carpeta, f"cache{i}", "jinja"))
+            frio.append(correr(MEDIR_PRIMERA, env_arranque, "frio")["primera"])
+            tibio.append(correr(MEDIR_PRIMERA, env_arranque, "frio")["primera"])
+            preparado.append(correr(MEDIR_PRIMERA, env_arranque, "preparado")["primera"])
+
+        def ms(valores):
+            return f"{statistics.median(valores) * 1000:8.2f}"
+
+        print(f"\nprimer render de examen.html en un proceso nuevo (mediana de {args.arranques})\n")
+        print(f"{'caso':52} {'ms':>8}")
+        print(f"{'compilando la plantilla (antes)':52} {ms(frio)}")
+        print(f"{'con bytecode en disco de un arranque anterior':52} {ms(tibio)}")
+        print(f"{'despues de preparar_proceso (ya precompilada)':52} {ms(preparado)}")
+
+        sin = correr(MEDIR_CALIENTE, entorno(carpeta, COMPRIMIR_RESPUESTAS="0"), args.repeticiones)
+        con = correr(MEDIR_CALIENTE, env, args.repeticiones)
+        print(f"\nen caliente, mediana de {args.repeticiones} peticiones (ms)\n")
+        print(f"{'pagina':12} {'render_template':>16} {'sin comprimir':>14} {'con br':>8}")
+        for nombre in ("registro", "login"):
+            print(
+                f"{nombre:12} {con[nombre + '_render'] * 1000:16.3f} "
+                f"{sin[nombre] * 1000:14.3f} {con[nombre] * 1000:8.3f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+import secrets
+
+# ------------------- BLOBS -------------------
+#
+# Cada PDF subido se guarda una sola vez por contenido: la tabla blobs
+# (migracion 6 de esquema.py) va del sha256 a la ruta en el almacenamiento y
+# documentos_subidos.blob_sha256 apunta a ella. Los triggers de la base llevan
+# la cuenta de referencias; recolectar() borra los blobs que quedaron sin
+# ninguna despues de un periodo de gracia.
+
+
+def ruta_nueva(sha256):
+    # Un sufijo por subida: si el GC borra un blob y alguien vuelve a subir el
+    # mismo contenido, el objeto nuevo no comparte ruta con el que se esta borrando
+    return f"blobs/{sha256}/{secrets.token_hex(4)}.pdf"
+
+
+def buscar(execute_query, sha256, ahora):
+    """(ruta, url) del blob si ya existe, renovando su uso para que el GC no lo tome."""
+    existe = execute_query(
+        "SELECT 1 FROM blobs WHERE sha256=?",
+        "SELECT 1 FROM blobs WHERE sha256=%s",
+        (sha256,),
+        fetchone=True
+    )
+    if existe is None:
+        return None
+
+    # Solo se escribe si existe, para no tomar el lock de escritura de SQLite
+    # durante la subida de un archivo nuevo
+    return execute_query(
+        "UPDATE blobs SET usado=? WHERE sha256=? RETURNING ruta, url",
+        "UPDATE blobs SET usado=%s WHERE sha256=%s RETURNING ruta, url",
+        (ahora, sha256),
+        fetchone=True
+    )
+
+
+def registrar(execute_query, sha256, ruta, url, tamano, ahora):
+    """Da de alta un blob recien subido y devuelve (ruta, url).
+
+    Si otra subida del mismo contenido se registro antes, devuelve la suya y
+    el objeto recien subido queda sin usar (el llamador lo borra).
+    """
+    fila = execute_query(
+        "INSERT INTO blobs (sha256, ruta, url, tamano, usado) VALUES (?, ?, ?, ?, ?) "
+        "ON CONFLICT (sha256) DO NOTHING RETURNING ruta, url",
+        "INSERT INTO blobs (sha256, ruta, url, tamano, usado) VALUES (%s, %s, %s, %s, %s) "
+        "ON CONFLICT (sha256) DO NOTHING RETURNING ruta, url",
+        (sha256, ruta, url, tamano, ahora),
+        fetchone=True
+    )
+    return fila if fila is not None else buscar(execute_query, sha256, ahora)
+
+
+def recolectar(execute_query, limite, lote=500):
+    """Borra de la tabla los blobs sin referencias y sin uso desde limite.
+
+    Devuelve sus rutas; el objeto se borra del almacenamiento despues de
+    confirmar, asi un fallo ahi deja basura en el bucket y no filas rotas.
+    """
+    # Las condiciones van tambien fuera del IN para que Postgres las vuelva a
+    # evaluar si una subida renovo el blob mientras tanto
+    filas = execute_query(
+        "DELETE FROM blobs WHERE referencias = 0 AND usado < ? AND sha256 IN ("
+        "SELECT sha256 FROM blobs WHERE referencias = 0 AND usado < ? LIMIT ?) RETURNING ruta",
+        "DELETE FROM blobs WHERE referencias = 0 AND usado < %s AND sha256 IN ("
+        "SELECT sha256 FROM blobs WHERE referencias = 0 AND usado < %s LIMIT %s) RETURNING ruta",
+        (limite, limite, lote),
+        fetchall=True
+    )
+    return [fila[0] for fila in filas]
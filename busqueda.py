@@ -0,0 +1,262 @@
+import re
+
+# ------------------- BUSQUEDA DE EXPEDIENTES -------------------
+#
+# Busqueda por expediente, nombre y carrera sobre un indice: FTS5 con
+# tokenizador trigram en SQLite y pg_trgm en Postgres (migracion 4 de
+# esquema.py). Una sola consulta trae la pagina de alumnos junto con sus
+# respuestas de encuesta y sus examenes, paginada por keyset: por id, por
+# (relevancia, id) en el modo difuso, o por la columna indexada en el modo
+# prefijo de SQLite.
+#
+# Modos:
+#   prefijo - palabras de menos de 3 caracteres: prefijo de expediente o nombre
+#   exacto  - el texto aparece tal cual (subcadena, sin importar mayusculas)
+#   difuso  - tolerante a errores; solo si "exacto" no encontro nada
+
+# Debe coincidir con la expresion del indice idx_usuarios_busqueda
+TEXTO_BUSQUEDA_PG = (
+    "(coalesce(u.expediente, '') || ' ' || coalesce(u.nombre, '') || ' ' || coalesce(u.carrera, ''))"
+)
+
+POR_PAGINA = 20
+
+# pagina trae (id, nombre, carrera, expediente, rango, clave); se ordena por
+# (rango, clave, id), el mismo orden en que se pagino
+_DETALLE_SQL = """
+SELECT p.id, p.nombre, p.carrera, p.expediente, p.rango, 'encuesta',
+       e.respuesta, NULL, NULL, NULL, NULL, NULL, NULL, p.clave
+FROM pagina p LEFT JOIN encuesta_salud e ON e.expediente = p.expediente
+UNION ALL
+SELECT p.id, p.nombre, p.carrera, p.expediente, p.rango, 'examen',
+       NULL, x.nombre, x.edad, x.carrera, x.documento, x.url, x.estado, p.clave
+FROM pagina p JOIN examenes x ON x.expediente = p.expediente
+ORDER BY 5, 14, 1
+"""
+
+
+def _frase_fts(texto):
+    return '"' + texto.replace('"', '""') + '"'
+
+
+def _expresion_fts(q, modo):
+    # El tokenizador trigram ignora terminos de menos de 3 caracteres
+    palabras = [p for p in q.split() if len(p) >= 3]
+    if modo == "exacto":
+        # Cada palabra como subcadena; en trigram una frase = subcadena
+        return " AND ".join(_frase_fts(p) for p in palabras)
+
+    trigramas = {p[i:i + 3].lower() for p in palabras for i in range(len(p) - 2)}
+    return " OR ".join(_frase_fts(t) for t in sorted(trigramas))
+
+
+def _fin_de_prefijo(prefijo):
+    return prefijo[:-1] + chr(ord(prefijo[-1]) + 1)
+
+
+# Prefijo en SQLite: primero los expedientes que empiezan con q (rango 0) y
+# despues los nombres (rango 1), cada tramo en el orden de su indice B-tree
+# (idx_usuarios_expediente e idx_usuarios_nombre_nocase, migracion 7) con su
+# propio LIMIT, asi SQLite deja de leer en cuanto llena la pagina. El cursor
+# guarda el tramo y el id de la ultima fila; su clave se vuelve a leer de la
+# tabla. NOCASE solo pliega letras ASCII, igual que lower().
+_PREFIJO_EXPEDIENTE = (
+    "SELECT u.id, u.nombre, u.carrera, u.expediente, 0.0 AS rango, u.expediente AS clave "
+    "FROM usuarios u WHERE u.expediente >= ? AND u.expediente < ? {despues}"
+    "ORDER BY u.expediente, u.id LIMIT ?"
+)
+_PREFIJO_NOMBRE = (
+    "SELECT u.id, u.nombre, u.carrera, u.expediente, 1.0 AS rango, lower(u.nombre) AS clave "
+    "FROM usuarios u WHERE u.nombre COLLATE NOCASE >= ? AND u.nombre COLLATE NOCASE < ? "
+    "AND (u.expediente IS NULL OR u.expediente < ? OR u.expediente >= ?) {despues}"
+    "ORDER BY u.nombre COLLATE NOCASE, u.id LIMIT ?"
+)
+
+
+def _pagina_prefijo_sqlite(q, despues, limite):
+    """SQL y parametros de la pagina de alumnos en el modo prefijo de SQLite."""
+    tramo, ultimo_id = despues if despues else (None, 0)
+    exp, nom = q.upper(), q.lower()
+    rango_exp = [exp, _fin_de_prefijo(exp)]
+    tramos, params = [], []
+
+    if tramo is None or tramo == 0:
+        despues_sql = ""
+        if tramo == 0:
+            despues_sql = "AND (u.expediente, u.id) > (SELECT expediente, id FROM usuarios WHERE id = ?) "
+        tramos.append(_PREFIJO_EXPEDIENTE.format(despues=despues_sql))
+        params += rango_exp + ([ultimo_id] if tramo == 0 else []) + [limite + 1]
+
+    despues_sql = ""
+    if tramo == 1:
+        despues_sql = (
+            "AND (u.nombre COLLATE NOCASE, u.id) > (SELECT nombre, id FROM usuarios WHERE id = ?) "
+        )
+    tramos.append(_PREFIJO_NOMBRE.format(despues=despues_sql))
+    params += [nom, _fin_de_prefijo(nom)] + rango_exp + ([ultimo_id] if tramo == 1 else []) + [limite + 1]
+
+    union = " UNION ALL ".join(f"SELECT * FROM ({t})" for t in tramos)
+    return f"SELECT * FROM ({union}) ORDER BY rango, clave, id LIMIT ?", params + [limite + 1]
+
+
+def _coincidencias_sqlite(q, modo):
+    """(FROM+WHERE, parametros, columna id) de los alumnos que coinciden."""
+    return (
+        "FROM usuarios_fts JOIN usuarios u ON u.id = usuarios_fts.rowid "
+        "WHERE usuarios_fts MATCH ?",
+        [_expresion_fts(q, modo)],
+        "usuarios_fts.rowid",
+    )
+
+
+def _coincidencias_postgres(q, modo):
+    if modo == "prefijo":
+        # Inicio de cualquier palabra; pg_trgm tambien indexa prefijos cortos
+        limpio = q.replace("\\", "").replace("%", "").replace("_", "")
+        return (
+            f"FROM usuarios u WHERE ({TEXTO_BUSQUEDA_PG} ILIKE %s OR {TEXTO_BUSQUEDA_PG} ILIKE %s)",
+            [limpio + "%", "% " + limpio + "%"],
+            "u.id",
+        )
+
+    if modo == "exacto":
+        condiciones = " AND ".join(f"{TEXTO_BUSQUEDA_PG} ILIKE %s" for _ in q.split())
+        params = ["%" + p.replace("%", r"\%").replace("_", r"\_") + "%" for p in q.split()]
+        return f"FROM usuarios u WHERE {condiciones}", params, "u.id"
+
+    return f"FROM usuarios u WHERE %s <%% {TEXTO_BUSQUEDA_PG}", [q], "u.id"
+
+
+def construir_consulta(q, modo, es_postgres, despues=None, limite=POR_PAGINA):
+    """SQL y parametros de una pagina de resultados con sus detalles."""
+    if modo == "prefijo" and not es_postgres:
+        pagina, params = _pagina_prefijo_sqlite(q, despues, limite)
+        return f"WITH pagina AS ({pagina}) " + _DETALLE_SQL, tuple(params)
+
+    rango, ultimo_id = despues if despues else (float("-inf"), 0)
+    columnas = "u.id, u.nombre, u.carrera, u.expediente"
+
+    if es_postgres:
+        desde, params, col_id = _coincidencias_postgres(q, modo)
+        ph = "%s"
+    else:
+        desde, params, col_id = _coincidencias_sqlite(q, modo)
+        ph = "?"
+
+    if modo == "difuso":
+        # Ordenar por relevancia obliga a puntuar todas las coincidencias
+        if es_postgres:
+            puntaje = f"-word_similarity(%s, {TEXTO_BUSQUEDA_PG})::float8"
+            candidatos = f"SELECT {columnas}, {puntaje} AS rango, '' AS clave {desde}"
+            params = [q] + params
+        else:
+            # Puntuar solo sobre el indice y unir con usuarios despues de LIMIT
+            candidatos = (
+                "SELECT rowid AS id, bm25(usuarios_fts) AS rango "
+                "FROM usuarios_fts WHERE usuarios_fts MATCH ?"
+            )
+        pagina = (
+            f"SELECT * FROM ({candidatos}) c "
+            f"WHERE rango > {ph} OR (rango = {ph} AND id > {ph}) "
+            f"ORDER BY rango, id LIMIT {ph}"
+        )
+        if not es_postgres:
+            pagina = (
+                f"SELECT {columnas}, c.rango, '' AS clave FROM ({pagina}) c "
+                "JOIN usuarios u ON u.id = c.id"
+            )
+        params = params + [rango, rango, ultimo_id, limite + 1]
+    else:
+        # Todas las coincidencias valen igual: keyset solo por id, y el
+        # indice puede cortar en cuanto llena la pagina
+        pagina = (
+            f"SELECT {columnas}, 0.0 AS rango, '' AS clave {desde} AND {col_id} > {ph} "
+            f"ORDER BY {col_id} LIMIT {ph}"
+        )
+        params = params + [ultimo_id, limite + 1]
+
+    return f"WITH pagina AS ({pagina}) " + _DETALLE_SQL, tuple(params)
+
+
+def agrupar(filas, limite=POR_PAGINA):
+    """Convierte las filas planas en [{usuario, encuesta, examen}] y el cursor siguiente."""
+    resultados, por_id = [], {}
+
+    for fila in filas:
+        uid, nombre, carrera, expediente, rango, tipo = fila[:6]
+        if uid not in por_id:
+            por_id[uid] = {
+                "usuario": {"id": uid, "nombre": nombre, "carrera": carrera, "expediente": expediente},
+                "encuesta": [],
+                "examen": [],
+                "_rango": rango,
+            }
+            resultados.append(por_id[uid])
+
+        datos = por_id[uid]
+        if tipo == "encuesta" and fila[6] is not None:
+            datos["encuesta"].append({"respuesta": fila[6]})
+        elif tipo == "examen":
+            datos["examen"].append(dict(zip(
+                ("nombre", "edad", "carrera", "documento", "url", "estado"), fila[7:13]
+            )))
+
+    siguiente = None
+    if len(resultados) > limite:
+        resultados = resultados[:limite]
+        ultimo = resultados[-1]
+        siguiente = (ultimo["_rango"], ultimo["usuario"]["id"])
+
+    for datos in resultados:
+        del datos["_rango"]
+    return resultados, siguiente
+
+
+def modo_inicial(q):
+    return "exacto" if any(len(p) >= 3 for p in q.split()) else "prefijo"
+
+
+def codificar_cursor(modo, despues):
+    rango, ultimo_id = despues
+    return f"{modo}:{rango!r}:{ultimo_id}"
+
+
+def decodificar_cursor(texto):
+    """Devuelve (modo, (rango, id)) o None si el cursor no es valido."""
+    m = re.fullmatch(r"(prefijo|exacto|difuso):(-?(?:inf|[0-9.e+-]+)):(\d+)", texto or "")
+    if not m:
+        return None
+    return m.group(1), (float(m.group(2)), int(m.group(3)))
+
+
+def cursor_valido(q, modo, despues):
+    """El cursor tiene que ser del modo que corresponde a q; si no, se ignora."""
+    if modo_inicial(q) == "prefijo":
+        # En prefijo el rango es el tramo: 0 expediente, 1 nombre
+        return modo == "prefijo" and despues[0] in (0.0, 1.0)
+    return modo in ("exacto", "difuso")
+
+
+def buscar(q, ejecutar, es_postgres, cursor=None, limite=POR_PAGINA):
+    """ejecutar(sql, params) -> filas. Devuelve (resultados, cursor_siguiente)."""
+    q = " ".join(q.split())
+    if not q:
+        return [], None
+
+    decodificado = decodificar_cursor(cursor) if cursor else None
+    if decodificado and not cursor_valido(q, *decodificado):
+        decodificado = None
+    modo, despues = decodificado if decodificado else (modo_inicial(q), None)
+
+    resultados, siguiente = agrupar(
+        ejecutar(*construir_consulta(q, modo, es_postgres, despues, limite)), limite
+    )
+
+    # Sin coincidencias exactas en la primera pagina: probar tolerante a errores
+    if not resultados and modo == "exacto" and despues is None:
+        modo = "difuso"
+        resultados, siguiente = agrupar(
+            ejecutar(*construir_consulta(q, modo, es_postgres, None, limite)), limite
+        )
+
+    return resultados, codificar_cursor(modo, siguiente) if siguiente else None
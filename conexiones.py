@@ -0,0 +1,286 @@
+import sqlite3
+import threading
+import time
+
+import psycopg2
+
+# ------------------- POOL DE CONEXIONES -------------------
+#
+# Conexiones reutilizables para execute_query. En Render cada conexion nueva
+# a Postgres cuesta un handshake TCP + TLS, asi que se prestan y devuelven
+# en lugar de abrir y cerrar una por consulta. En local se hace lo mismo
+# con conexiones sqlite3.
+
+
+class MetricasPool:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.prestamos = 0
+        self.en_uso = 0
+        self.creadas = 0
+        self.descartadas = 0
+        self.espera_total = 0.0
+        self.espera_max = 0.0
+
+    def registrar_prestamo(self, espera):
+        with self._lock:
+            self.prestamos += 1
+            self.en_uso += 1
+            self.espera_total += espera
+            self.espera_max = max(self.espera_max, espera)
+
+    def registrar_devolucion(self):
+        with self._lock:
+            self.en_uso -= 1
+
+    def registrar_creada(self):
+        with self._lock:
+            self.creadas += 1
+
+    def registrar_descartada(self):
+        with self._lock:
+            self.descartadas += 1
+
+    def como_dict(self):
+        with self._lock:
+            return {
+                "prestamos": self.prestamos,
+                "en_uso": self.en_uso,
+                "creadas": self.creadas,
+                "descartadas": self.descartadas,
+                "espera_total_s": self.espera_total,
+                "espera_max_s": self.espera_max,
+                "espera_media_s": self.espera_total / self.prestamos if self.prestamos else 0.0,
+            }
+
+
+class PoolAgotado(Exception):
+    pass
+
+
+class PoolPostgres:
+    """Pool thread-safe de conexiones psycopg2.
+
+    Antes de prestar una conexion que lleva mas de ``verificar_tras`` segundos
+    inactiva se comprueba con ``SELECT 1``; las que superan ``vida_maxima``
+    segundos se cierran y se reemplazan.
+    """
+
+    def __init__(self, dsn, maximo=4, vida_maxima=1800, verificar_tras=30,
+                 espera_maxima=10, **kwargs_conexion):
+        self.dsn = dsn
+        self.maximo = maximo
+        self.vida_maxima = vida_maxima
+        self.verificar_tras = verificar_tras
+        self.espera_maxima = espera_maxima
+        self.kwargs_conexion = kwargs_conexion
+        self.metricas = MetricasPool()
+
+        self._cond = threading.Condition()
+        self._libres = []      # [(conn, devuelta_en)]
+        self._creada_en = {}   # id(conn) -> timestamp
+        self._abiertas = 0
+        self._cerrado = False
+
+    def _crear(self):
+        conn = psycopg2.connect(self.dsn, **self.kwargs_conexion)
+        self._creada_en[id(conn)] = time.monotonic()
+        self.metricas.registrar_creada()
+        return conn
+
+    def _cerrar(self, conn):
+        self._creada_en.pop(id(conn), None)
+        try:
+            conn.close()
+        except Exception:
+            pass
+        self.metricas.registrar_descartada()
+
+    def _caducada(self, conn):
+        creada = self._creada_en.get(id(conn), 0)
+        return time.monotonic() - creada > self.vida_maxima
+
+    def _sana(self, conn, devuelta_en):
+        if conn.closed:
+            return False
+        if time.monotonic() - devuelta_en < self.verificar_tras:
+            return True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except Exception:
+            return False
+
+    def obtener(self):
+        inicio = time.monotonic()
+        limite = inicio + self.espera_maxima
+
+        while True:
+            with self._cond:
+                if self._cerrado:
+                    raise PoolAgotado("El pool de conexiones esta cerrado")
+
+                candidata = None
+                if self._libres:
+                    candidata = self._libres.pop()
+                elif self._abiertas < self.maximo:
+                    self._abiertas += 1
+                else:
+                    restante = limite - time.monotonic()
+                    if restante <= 0:
+                        raise PoolAgotado(
+                            f"Sin conexiones libres tras {self.espera_maxima}s"
+                        )
+                    self._cond.wait(restante)
+                    continue
+
+            # La verificacion y la conexion nueva se hacen fuera del lock
+            if candidata is not None:
+                conn, devuelta_en = candidata
+                if not self._caducada(conn) and self._sana(conn, devuelta_en):
+                    break
+                self._cerrar(conn)
+                with self._cond:
+                    self._abiertas -= 1
+                continue
+
+            try:
+                conn = self._crear()
+            except Exception:
+                with self._cond:
+                    self._abiertas -= 1
+                    self._cond.notify()
+                raise
+            break
+
+        self.metricas.registrar_prestamo(time.monotonic() - inicio)
+        return conn
+
+    def devolver(self, conn, descartar=False):
+        self.metricas.registrar_devolucion()
+
+        if not descartar and not conn.closed:
+            try:
+                conn.rollback()  # no dejar transacciones abiertas en el pool
+            except Exception:
+                descartar = True
+
+        with self._cond:
+            if descartar or conn.closed or self._cerrado or self._caducada(conn):
+                self._abiertas -= 1
+                cerrar = True
+            else:
+                self._libres.append((conn, time.monotonic()))
+                cerrar = False
+            self._cond.notify()
+
+        if cerrar:
+            self._cerrar(conn)
+
+    def cerrar(self):
+        with self._cond:
+            self._cerrado = True
+            libres, self._libres = self._libres, []
+            self._abiertas -= len(libres)
+            self._cond.notify_all()
+        for conn, _ in libres:
+            self._cerrar(conn)
+
+    def estado(self):
+        datos = self.metricas.como_dict()
+        with self._cond:
+            datos.update(maximo=self.maximo, abiertas=self._abiertas, libres=len(self._libres))
+        return datos
+
+
+class PoolSQLite:
+    """Conexiones sqlite3 reutilizables, con la misma interfaz que PoolPostgres.
+
+    Se prestan y devuelven como en Postgres en lugar de atarlas a un hilo: el
+    servidor de desarrollo abre un hilo por peticion y una conexion por hilo
+    dejaba un descriptor abierto por cada peticion atendida. Solo se guardan
+    ``maximo`` libres; las que sobran al devolverse se cierran.
+    """
+
+    def __init__(self, ruta, maximo=4, vida_maxima=1800):
+        self.ruta = ruta
+        self.maximo = maximo
+        self.vida_maxima = vida_maxima
+        self.metricas = MetricasPool()
+        self._lock = threading.Lock()
+        self._libres = []      # [(conn, creada_en)]
+        self._prestadas = {}   # id(conn) -> creada_en
+        self._cerrado = False
+
+    def _crear(self):
+        # check_same_thread=False: la conexion puede volver al pool desde otro hilo
+        conn = sqlite3.connect(self.ruta, timeout=30, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        self.metricas.registrar_creada()
+        return conn
+
+    def _cerrar(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+        self.metricas.registrar_descartada()
+
+    def obtener(self):
+        inicio = time.monotonic()
+
+        while True:
+            with self._lock:
+                if self._cerrado:
+                    raise PoolAgotado("El pool de conexiones esta cerrado")
+                candidata = self._libres.pop() if self._libres else None
+            if candidata is None:
+                conn, creada_en = self._crear(), time.monotonic()
+                break
+
+            conn, creada_en = candidata
+            if time.monotonic() - creada_en <= self.vida_maxima:
+                break
+            self._cerrar(conn)
+
+        with self._lock:
+            self._prestadas[id(conn)] = creada_en
+        self.metricas.registrar_prestamo(time.monotonic() - inicio)
+        return conn
+
+    def devolver(self, conn, descartar=False):
+        self.metricas.registrar_devolucion()
+        if not descartar:
+            try:
+                if conn.in_transaction:
+                    conn.rollback()
+            except sqlite3.Error:
+                descartar = True
+
+        with self._lock:
+            creada_en = self._prestadas.pop(id(conn), 0)
+            guardar = not descartar and not self._cerrado and len(self._libres) < self.maximo
+            if guardar:
+                self._libres.append((conn, creada_en))
+        if not guardar:
+            self._cerrar(conn)
+
+    def cerrar(self):
+        with self._lock:
+            self._cerrado = True
+            libres, self._libres = self._libres, []
+        for conn, _ in libres:
+            self._cerrar(conn)
+
+    def estado(self):
+        datos = self.metricas.como_dict()
+        with self._lock:
+            datos.update(
+                maximo=self.maximo,
+                abiertas=len(self._libres) + len(self._prestadas),
+                libres=len(self._libres),
+            )
+        return datos
@@ -0,0 +1,331 @@
+from datetime import datetime
+
+# ------------------- MIGRACIONES -------------------
+#
+# Cada migracion es (version, descripcion, sentencias_sqlite, sentencias_postgres).
+# Una sentencia puede ser una funcion que recibe el cursor, para lo que el SQL
+# del motor no sabe hacer condicional.
+# Solo se agregan al final; nunca se edita una que ya se aplico en produccion.
+
+
+def _agregar_columna_sqlite(tabla, columna, definicion):
+    """ALTER TABLE ... ADD COLUMN solo si falta: SQLite no tiene IF NOT EXISTS."""
+    def agregar(cursor):
+        cursor.execute(f"PRAGMA table_info({tabla})")
+        if columna not in [fila[1] for fila in cursor.fetchall()]:
+            cursor.execute(f"ALTER TABLE {tabla} ADD COLUMN {columna} {definicion}")
+    return agregar
+
+
+MIGRACIONES = [
+    (
+        1,
+        "esquema base",
+        [
+            """CREATE TABLE IF NOT EXISTS usuarios (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                nombre TEXT,
+                password TEXT,
+                carrera TEXT,
+                expediente TEXT,
+                rol TEXT DEFAULT 'alumno'
+            )""",
+            """CREATE TABLE IF NOT EXISTS encuesta_salud (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                expediente TEXT,
+                respuesta TEXT
+            )""",
+            """CREATE TABLE IF NOT EXISTS examenes (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                expediente TEXT,
+                nombre TEXT,
+                edad TEXT,
+                carrera TEXT,
+                documento TEXT,
+                fecha TEXT,
+                url TEXT
+            )""",
+            """CREATE TABLE IF NOT EXISTS documentos_subidos (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                expediente TEXT NOT NULL,
+                nombre_archivo TEXT NOT NULL,
+                nombre_original TEXT NOT NULL,
+                fecha TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                url TEXT
+            )""",
+        ],
+        [
+            """CREATE TABLE IF NOT EXISTS usuarios (
+                id SERIAL PRIMARY KEY,
+                nombre TEXT,
+                password TEXT,
+                carrera TEXT,
+                expediente TEXT,
+                rol TEXT DEFAULT 'alumno'
+            )""",
+            """CREATE TABLE IF NOT EXISTS encuesta_salud (
+                id SERIAL PRIMARY KEY,
+                expediente TEXT,
+                respuesta TEXT
+            )""",
+            """CREATE TABLE IF NOT EXISTS examenes (
+                id SERIAL PRIMARY KEY,
+                expediente TEXT,
+                nombre TEXT,
+                edad TEXT,
+                carrera TEXT,
+                documento TEXT,
+                fecha TIMESTAMP,
+                url TEXT
+            )""",
+            """CREATE TABLE IF NOT EXISTS documentos_subidos (
+                id SERIAL PRIMARY KEY,
+                expediente TEXT NOT NULL,
+                nombre_archivo TEXT NOT NULL,
+                nombre_original TEXT NOT NULL,
+                fecha TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                url TEXT
+            )""",
+        ],
+    ),
+    (
+        2,
+        "indices de login, registro y paginas por expediente",
+        [
+            "CREATE INDEX IF NOT EXISTS idx_usuarios_nombre_password ON usuarios (nombre, password)",
+            "CREATE INDEX IF NOT EXISTS idx_usuarios_nombre_carrera ON usuarios (nombre, carrera)",
+            "CREATE INDEX IF NOT EXISTS idx_usuarios_carrera_expediente ON usuarios (carrera, expediente DESC)",
+            "CREATE INDEX IF NOT EXISTS idx_encuesta_expediente ON encuesta_salud (expediente)",
+            "CREATE INDEX IF NOT EXISTS idx_examenes_expediente_fecha ON examenes (expediente, fecha)",
+            "CREATE INDEX IF NOT EXISTS idx_documentos_expediente_fecha ON documentos_subidos (expediente, fecha)",
+        ],
+        [
+            "CREATE INDEX IF NOT EXISTS idx_usuarios_nombre_password ON usuarios (nombre, password)",
+            "CREATE INDEX IF NOT EXISTS idx_usuarios_nombre_carrera ON usuarios (nombre, carrera)",
+            "CREATE INDEX IF NOT EXISTS idx_usuarios_carrera_expediente ON usuarios (carrera, expediente DESC)",
+            "CREATE INDEX IF NOT EXISTS idx_encuesta_expediente ON encuesta_salud (expediente)",
+            "CREATE INDEX IF NOT EXISTS idx_examenes_expediente_fecha ON examenes (expediente, fecha)",
+            "CREATE INDEX IF NOT EXISTS idx_documentos_expediente_fecha ON documentos_subidos (expediente, fecha)",
+            "ANALYZE usuarios",
+            "ANALYZE encuesta_salud",
+            "ANALYZE examenes",
+            "ANALYZE documentos_subidos",
+        ],
+    ),
+    (
+        3,
+        "estado de generacion de examenes",
+        [
+            "ALTER TABLE examenes ADD COLUMN estado TEXT NOT NULL DEFAULT 'listo'",
+        ],
+        [
+            "ALTER TABLE examenes ADD COLUMN IF NOT EXISTS estado TEXT NOT NULL DEFAULT 'listo'",
+        ],
+    ),
+    (
+        4,
+        "indice de busqueda de expedientes",
+        [
+            "CREATE INDEX IF NOT EXISTS idx_usuarios_expediente ON usuarios (expediente)",
+            """CREATE VIRTUAL TABLE IF NOT EXISTS usuarios_fts USING fts5(
+                expediente, nombre, carrera,
+                content='usuarios', content_rowid='id', tokenize='trigram'
+            )""",
+            """CREATE TRIGGER IF NOT EXISTS usuarios_fts_ai AFTER INSERT ON usuarios BEGIN
+                INSERT INTO usuarios_fts (rowid, expediente, nombre, carrera)
+                VALUES (new.id, new.expediente, new.nombre, new.carrera);
+            END""",
+            """CREATE TRIGGER IF NOT EXISTS usuarios_fts_ad AFTER DELETE ON usuarios BEGIN
+                INSERT INTO usuarios_fts (usuarios_fts, rowid, expediente, nombre, carrera)
+                VALUES ('delete', old.id, old.expediente, old.nombre, old.carrera);
+            END""",
+            """CREATE TRIGGER IF NOT EXISTS usuarios_fts_au AFTER UPDATE ON usuarios BEGIN
+                INSERT INTO usuarios_fts (usuarios_fts, rowid, expediente, nombre, carrera)
+                VALUES ('delete', old.id, old.expediente, old.nombre, old.carrera);
+                INSERT INTO usuarios_fts (rowid, expediente, nombre, carrera)
+                VALUES (new.id, new.expediente, new.nombre, new.carrera);
+            END""",
+            "INSERT INTO usuarios_fts (usuarios_fts) VALUES ('rebuild')",
+        ],
+        [
+            "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+            "CREATE INDEX IF NOT EXISTS idx_usuarios_expediente ON usuarios (expediente)",
+            # La expresion tiene que coincidir con TEXTO_BUSQUEDA_PG de busqueda.py
+            """CREATE INDEX IF NOT EXISTS idx_usuarios_busqueda ON usuarios USING gin (
+                (coalesce(expediente, '') || ' ' || coalesce(nombre, '') || ' ' || coalesce(carrera, ''))
+                gin_trgm_ops
+            )""",
+        ],
+    ),
+    (
+        5,
+        "contadores de encuesta y examenes por carrera y dia",
+        [
+            "ALTER TABLE encuesta_salud ADD COLUMN fecha TEXT",
+            """CREATE TABLE IF NOT EXISTS resumen_diario (
+                dia TEXT NOT NULL,
+                carrera TEXT NOT NULL,
+                metrica TEXT NOT NULL,
+                valor TEXT NOT NULL,
+                cantidad INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (dia, carrera, metrica, valor)
+            )""",
+        ],
+        [
+            "ALTER TABLE encuesta_salud ADD COLUMN IF NOT EXISTS fecha TIMESTAMP",
+            """CREATE TABLE IF NOT EXISTS resumen_diario (
+                dia TEXT NOT NULL,
+                carrera TEXT NOT NULL,
+                metrica TEXT NOT NULL,
+                valor TEXT NOT NULL,
+                cantidad INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (dia, carrera, metrica, valor)
+            )""",
+        ],
+    ),
+    (
+        6,
+        "blobs de documentos por contenido (sha256) con conteo de referencias",
+        [
+            """CREATE TABLE IF NOT EXISTS blobs (
+                sha256 TEXT PRIMARY KEY,
+                ruta TEXT NOT NULL,
+                url TEXT NOT NULL,
+                tamano INTEGER NOT NULL,
+                referencias INTEGER NOT NULL DEFAULT 0,
+                usado TEXT NOT NULL
+            )""",
+            "ALTER TABLE documentos_subidos ADD COLUMN blob_sha256 TEXT REFERENCES blobs (sha256)",
+            "CREATE INDEX IF NOT EXISTS idx_documentos_blob ON documentos_subidos (blob_sha256)",
+            "CREATE INDEX IF NOT EXISTS idx_blobs_huerfanos ON blobs (usado) WHERE referencias = 0",
+            # Las referencias las cuenta la base: vale tambien para borrados a mano
+            """CREATE TRIGGER IF NOT EXISTS documentos_blob_ai AFTER INSERT ON documentos_subidos BEGIN
+                UPDATE blobs SET referencias = referencias + 1 WHERE sha256 = new.blob_sha256;
+            END""",
+            """CREATE TRIGGER IF NOT EXISTS documentos_blob_ad AFTER DELETE ON documentos_subidos BEGIN
+                UPDATE blobs SET referencias = referencias - 1, usado = datetime('now', 'localtime')
+                WHERE sha256 = old.blob_sha256;
+            END""",
+            """CREATE TRIGGER IF NOT EXISTS documentos_blob_au AFTER UPDATE OF blob_sha256 ON documentos_subidos BEGIN
+                UPDATE blobs SET referencias = referencias - 1, usado = datetime('now', 'localtime')
+                WHERE sha256 = old.blob_sha256;
+                UPDATE blobs SET referencias = referencias + 1 WHERE sha256 = new.blob_sha256;
+            END""",
+        ],
+        [
+            """CREATE TABLE IF NOT EXISTS blobs (
+                sha256 TEXT PRIMARY KEY,
+                ruta TEXT NOT NULL,
+                url TEXT NOT NULL,
+                tamano BIGINT NOT NULL,
+                referencias INTEGER NOT NULL DEFAULT 0,
+                usado TIMESTAMP NOT NULL
+            )""",
+            "ALTER TABLE documentos_subidos ADD COLUMN IF NOT EXISTS blob_sha256 TEXT REFERENCES blobs (sha256)",
+            "CREATE INDEX IF NOT EXISTS idx_documentos_blob ON documentos_subidos (blob_sha256)",
+            "CREATE INDEX IF NOT EXISTS idx_blobs_huerfanos ON blobs (usado) WHERE referencias = 0",
+            """CREATE OR REPLACE FUNCTION contar_referencias_blob() RETURNS trigger AS $$
+            BEGIN
+                IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                    UPDATE blobs SET referencias = referencias - 1, usado = localtimestamp
+                    WHERE sha256 = OLD.blob_sha256;
+                END IF;
+                IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                    UPDATE blobs SET referencias = referencias + 1 WHERE sha256 = NEW.blob_sha256;
+                END IF;
+                RETURN NULL;
+            END
+            $$ LANGUAGE plpgsql""",
+            "DROP TRIGGER IF EXISTS documentos_blob_referencias ON documentos_subidos",
+            """CREATE TRIGGER documentos_blob_referencias
+                AFTER INSERT OR DELETE OR UPDATE OF blob_sha256 ON documentos_subidos
+                FOR EACH ROW EXECUTE FUNCTION contar_referencias_blob()""",
+        ],
+    ),
+    (
+        7,
+        "prefijo de nombre sin importar mayusculas",
+        [
+            # busqueda.py compara los prefijos de nombre con COLLATE NOCASE
+            "CREATE INDEX IF NOT EXISTS idx_usuarios_nombre_nocase ON usuarios (nombre COLLATE NOCASE)",
+        ],
+        [
+            # En Postgres el prefijo ya va con ILIKE sobre idx_usuarios_busqueda
+        ],
+    ),
+    (
+        8,
+        "columna rol en usuarios",
+        [
+            # La migracion 1 no altera tablas que ya existian antes de ella
+            _agregar_columna_sqlite("usuarios", "rol", "TEXT DEFAULT 'alumno'"),
+        ],
+        [
+            "ALTER TABLE usuarios ADD COLUMN IF NOT EXISTS rol TEXT DEFAULT 'alumno'",
+        ],
+    ),
+]
+
+# Clave arbitraria para pg_advisory_xact_lock: dos workers que arrancan a la
+# vez no aplican la misma migracion dos veces
+_LLAVE_MIGRACION = 7212025
+
+
+def version_actual(conn):
+    cursor = conn.cursor()
+    cursor.execute(
+        "CREATE TABLE IF NOT EXISTS esquema_version ("
+        "version INTEGER PRIMARY KEY, descripcion TEXT, aplicada TEXT)"
+    )
+    cursor.execute("SELECT MAX(version) FROM esquema_version")
+    fila = cursor.fetchone()
+    cursor.close()
+    return fila[0] or 0
+
+
+def aplicar_migraciones(conn, es_postgres, hasta=None):
+    """Aplica en orden las migraciones pendientes. Devuelve las versiones aplicadas."""
+    aplicadas = []
+    ph = "%s" if es_postgres else "?"
+
+    # Camino rapido en cada arranque: sin pendientes no se toma ningun lock
+    ultima = MIGRACIONES[-1][0] if hasta is None else hasta
+    al_dia = version_actual(conn) >= ultima
+    conn.commit()
+    if al_dia:
+        return aplicadas
+
+    for version, descripcion, sql_sqlite, sql_postgres in MIGRACIONES:
+        if hasta is not None and version > hasta:
+            break
+
+        cursor = conn.cursor()
+        if es_postgres:
+            cursor.execute("SELECT pg_advisory_xact_lock(%s)", (_LLAVE_MIGRACION,))
+        else:
+            cursor.execute("BEGIN IMMEDIATE")
+
+        try:
+            if version <= version_actual(conn):
+                conn.rollback()
+                continue
+
+            for sentencia in (sql_postgres if es_postgres else sql_sqlite):
+                if callable(sentencia):
+                    sentencia(cursor)
+                else:
+                    cursor.execute(sentencia)
+
+            cursor.execute(
+                f"INSERT INTO esquema_version (version, descripcion, aplicada) VALUES ({ph}, {ph}, {ph})",
+                (version, descripcion, datetime.now().isoformat(timespec="seconds"))
+            )
+            conn.commit()
+            aplicadas.append(version)
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+
+    return aplicadas
@@ -0,0 +1,178 @@
+import csv
+import hashlib
+import io
+import zipfile
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+# ------------------- EXPORTACION MASIVA -------------------
+#
+# ZIP con los PDFs de una carrera/rango de fechas y un CSV de la encuesta.
+# El ZIP se genera por partes mientras se envia (nunca entero en memoria) y
+# es determinista: misma seleccion -> mismos bytes, lo que permite reanudar
+# una descarga con Range regenerando y saltando los bytes ya enviados.
+#
+# Los archivos se leen por ruta con las funciones del almacenamiento
+# (almacen.tamano / almacen.descargar), no por su URL guardada.
+
+Entrada = namedtuple("Entrada", "nombre ruta tamano fecha")
+
+NOMBRE_FALTANTES = "faltantes.txt"
+
+
+class ExportacionInconsistente(Exception):
+    pass
+
+
+def con_tamanos(entradas, obtener_tamano, hilos=8):
+    """Completa en paralelo el tamano de las entradas que no lo traen.
+
+    obtener_tamano(ruta) devuelve None si el objeto no existe. Devuelve
+    (entradas presentes, nombres de las faltantes): un archivo perdido se
+    anota en el ZIP en lugar de tumbar toda la exportacion.
+    """
+    sin_tamano = [e for e in entradas if e.tamano is None]
+    with ThreadPoolExecutor(max_workers=hilos) as pool:
+        tamanos = dict(zip(sin_tamano, pool.map(lambda e: obtener_tamano(e.ruta), sin_tamano)))
+
+    presentes, faltantes = [], []
+    for e in entradas:
+        tamano = tamanos.get(e, e.tamano)
+        if tamano is None:
+            faltantes.append(e.nombre)
+        else:
+            presentes.append(e._replace(tamano=tamano))
+    return presentes, faltantes
+
+
+def nota_faltantes(faltantes):
+    if not faltantes:
+        return b""
+    lineas = ["Archivos registrados que no se encontraron en el almacenamiento:", ""]
+    return ("\n".join(lineas + list(faltantes)) + "\n").encode("utf-8")
+
+
+def csv_encuesta(filas):
+    salida = io.StringIO()
+    escritor = csv.writer(salida)
+    escritor.writerow(["expediente", "nombre", "carrera", "respuesta"])
+    escritor.writerows(filas)
+    return salida.getvalue().encode("utf-8-sig")  # BOM para que Excel respete acentos
+
+
+def huella(entradas, contenido_csv, faltantes=()):
+    """ETag de la exportacion: cambia si cambia cualquier archivo, el CSV o los faltantes."""
+    h = hashlib.sha256(contenido_csv)
+    h.update(nota_faltantes(faltantes))
+    for e in entradas:
+        h.update(f"{e.nombre}\0{e.ruta}\0{e.tamano}\0{e.fecha}\n".encode())
+    return h.hexdigest()[:32]
+
+
+def _fecha_zip(fecha):
+    if isinstance(fecha, str):
+        try:
+            fecha = datetime.fromisoformat(fecha[:19])
+        except ValueError:
+            fecha = None
+    if fecha is None or fecha.year < 1980:
+        return (1980, 1, 1, 0, 0, 0)
+    return fecha.timetuple()[:6]
+
+
+def _info(nombre, fecha):
+    info = zipfile.ZipInfo(nombre, date_time=_fecha_zip(fecha))
+    info.compress_type = zipfile.ZIP_STORED  # los PDF ya vienen comprimidos
+    info.external_attr = 0o644 << 16
+    return info
+
+
+class _Sumidero:
+    """Destino no buscable para ZipFile: acumula lo escrito hasta que se vacia."""
+
+    def __init__(self):
+        self._partes = []
+
+    def write(self, datos):
+        self._partes.append(bytes(datos))
+        return len(datos)
+
+    def flush(self):
+        pass
+
+    def vaciar(self):
+        datos = b"".join(self._partes)
+        self._partes = []
+        return datos
+
+
+def generar_zip(entradas, contenido_csv, descargar, faltantes=(), hilos=4, ventana=8):
+    """Generador de bytes del ZIP; descargar(ruta) devuelve los bytes del archivo.
+
+    Las descargas van por delante en un pool acotado: como mucho ``ventana``
+    archivos en memoria a la vez, sin importar cuantos tenga la exportacion.
+    Con ``descargar=None`` se escriben ceros del tamano esperado, lo que sirve
+    para calcular el largo exacto del ZIP sin descargar nada. Un archivo que
+    desaparece con la descarga ya en curso corta el ZIP: el Content-Length
+    anunciado ya no se podria cumplir.
+    """
+    sumidero = _Sumidero()
+    zf = zipfile.ZipFile(sumidero, "w")
+    pool = ThreadPoolExecutor(max_workers=hilos) if descargar else None
+    pendientes = deque()
+    restantes = iter(entradas)
+
+    def llenar_ventana():
+        for entrada in restantes:
+            futuro = pool.submit(descargar, entrada.ruta) if pool else None
+            pendientes.append((entrada, futuro))
+            if len(pendientes) >= ventana:
+                break
+
+    try:
+        zf.writestr(_info("encuesta_salud.csv", None), contenido_csv)
+        if faltantes:
+            zf.writestr(_info(NOMBRE_FALTANTES, None), nota_faltantes(faltantes))
+        yield sumidero.vaciar()
+
+        llenar_ventana()
+        while pendientes:
+            entrada, futuro = pendientes.popleft()
+            llenar_ventana()
+
+            try:
+                datos = futuro.result() if futuro else bytes(entrada.tamano)
+            except LookupError as e:
+                raise ExportacionInconsistente(f"{entrada.nombre} ya no existe") from e
+            if len(datos) != entrada.tamano:
+                # El Content-Length anunciado ya no seria correcto
+                raise ExportacionInconsistente(f"{entrada.nombre} cambio de tamano")
+
+            zf.writestr(_info(entrada.nombre, entrada.fecha), datos)
+            yield sumidero.vaciar()
+
+        zf.close()
+        yield sumidero.vaciar()
+    finally:
+        if pool:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+
+def tamano_zip(entradas, contenido_csv, faltantes=()):
+    return sum(len(parte) for parte in generar_zip(entradas, contenido_csv, None, faltantes))
+
+
+def recortar(partes, inicio, fin):
+    """Deja pasar solo los bytes [inicio, fin) de un generador de bytes."""
+    posicion = 0
+    try:
+        for parte in partes:
+            siguiente = posicion + len(parte)
+            if siguiente > inicio:
+                yield parte[max(0, inicio - posicion):fin - posicion]
+            posicion = siguiente
+            if posicion >= fin:
+                break
+    finally:
+        partes.close()  # libera el pool de descargas si el cliente corta
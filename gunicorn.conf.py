@@ -0,0 +1,114 @@
+# ------------------- GUNICORN -------------------
+#
+# gunicorn -c gunicorn.conf.py wsgi:app
+#
+# Workers y hilos salen de los CPU disponibles; WEB_CONCURRENCY y
+# GUNICORN_THREADS los fijan a mano. La app es casi toda espera de red
+# (Postgres, Supabase), por eso cada worker atiende varias peticiones con hilos.
+#
+# Cada worker importa la app completa y abre hasta DB_POOL_MAX conexiones
+# (GUNICORN_THREADS + TRABAJOS_HILOS, 6 por omision), asi que el presupuesto
+# de conexiones a Postgres es workers x DB_POOL_MAX: con el tope de
+# GUNICORN_MAX_WORKERS (4) son 24, que debe quedar por debajo de
+# max_connections de la base junto con las de cualquier otro cliente.
+import math
+import os
+import signal
+
+
+def _cuota_cgroup():
+    """CPU que permite la cuota del cgroup (cpu.max o cfs_quota_us), o None si no hay."""
+    try:
+        # cgroup v2: "<cuota> <periodo>" o "max <periodo>"
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            cuota, periodo = f.read().split()[:2]
+    except (OSError, ValueError):
+        try:
+            # cgroup v1: cuota -1 es sin limite
+            with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as f:
+                cuota = f.read().strip()
+            with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as f:
+                periodo = f.read().strip()
+        except OSError:
+            return None
+    if cuota in ("max", "-1"):
+        return None
+    try:
+        return int(cuota) / int(periodo)
+    except (ValueError, ZeroDivisionError):
+        return None
+
+
+def _cpus():
+    try:
+        cpus = len(os.sched_getaffinity(0))  # cpuset del contenedor
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    # La afinidad no refleja la cuota: en una instancia de 0.5 CPU se ven
+    # todos los nucleos de la maquina
+    cuota = _cuota_cgroup()
+    if cuota is not None:
+        cpus = min(cpus, max(1, math.ceil(cuota)))
+    return cpus
+
+
+workers = int(os.environ.get(
+    "WEB_CONCURRENCY",
+    min(_cpus() * 2 + 1, int(os.environ.get("GUNICORN_MAX_WORKERS", 4)))
+))
+threads = int(os.environ.get("GUNICORN_THREADS", 4))
+worker_class = "gthread"
+
+# app.py dimensiona el pool de conexiones de cada worker con esto
+os.environ["GUNICORN_THREADS"] = str(threads)
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 8000)}"
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 60))
+graceful_timeout = int(os.environ.get("GUNICORN_GRACEFUL_TIMEOUT", 30))
+keepalive = 5
+
+# Recicla workers de vez en cuando; el jitter evita que reinicien todos juntos
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", 2000))
+max_requests_jitter = max_requests // 10
+
+# Cada worker importa la app por su cuenta: nada de conexiones heredadas del master
+preload_app = False
+
+# GUNICORN_ACCESSLOG vacio lo desactiva (pruebas de carga)
+accesslog = os.environ.get("GUNICORN_ACCESSLOG", "-") or None
+errorlog = "-"
+
+
+def on_starting(server):
+    pool = int(os.environ.get("DB_POOL_MAX", threads + int(os.environ.get("TRABAJOS_HILOS", 2))))
+    server.log.info("%s workers x %s conexiones = hasta %s conexiones a la base",
+                    workers, pool, workers * pool)
+
+
+def post_worker_init(worker):
+    import app
+
+    # Esquema, cola y conserje antes de aceptar la primera peticion. Si la base
+    # no responde no falla: se reintenta con las peticiones y /listo da 503
+    app.preparar_proceso()
+
+    # Al recibir SIGTERM /listo responde 503 mientras se drenan las peticiones
+    anterior = signal.getsignal(signal.SIGTERM)
+
+    def al_terminar(signum, frame):
+        app.APAGANDO.set()
+        if callable(anterior):
+            anterior(signum, frame)
+
+    signal.signal(signal.SIGTERM, al_terminar)
+
+
+def worker_exit(server, worker):
+    # gunicorn tambien llama a este hook en el master al recoger un worker:
+    # ahi no hay nada que apagar y no hay que importar la app
+    if worker.pid != os.getpid():
+        return
+
+    import app
+
+    app.apagar(timeout=graceful_timeout)
@@ -0,0 +1,199 @@
+import re
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+
+from flask import g, has_request_context
+
+# ------------------- METRICAS -------------------
+#
+# Contadores, gauges e histogramas en memoria del proceso, expuestos en el
+# formato de texto de Prometheus. Con gunicorn cada worker tiene los suyos
+# (Prometheus los distingue por instancia).
+
+PREFIJO = "serviciomed_"
+
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+def _etiquetas(nombres, valores):
+    if not nombres:
+        return ""
+    pares = ",".join(
+        f'{n}="{str(v).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+        for n, v in zip(nombres, valores)
+    )
+    return "{" + pares + "}"
+
+
+class _Metrica:
+    tipo = None
+
+    def __init__(self, nombre, ayuda, etiquetas=()):
+        self.nombre = PREFIJO + nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self._lock = threading.Lock()
+        self._valores = {}
+
+    def _clave(self, etiquetas):
+        return tuple(etiquetas.get(n, "") for n in self.etiquetas)
+
+    def fijar(self, valor, **etiquetas):
+        """Para valores que ya se cuentan en otro lado (pool, caches) y se copian al exponer."""
+        with self._lock:
+            self._valores[self._clave(etiquetas)] = valor
+
+    def exponer(self):
+        lineas = [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} {self.tipo}"]
+        with self._lock:
+            valores = dict(self._valores)
+        for clave, valor in sorted(valores.items()):
+            lineas.extend(self._lineas(clave, valor))
+        return lineas
+
+    def _lineas(self, clave, valor):
+        return [f"{self.nombre}{_etiquetas(self.etiquetas, clave)} {valor}"]
+
+
+class Contador(_Metrica):
+    tipo = "counter"
+
+    def inc(self, cantidad=1, **etiquetas):
+        clave = self._clave(etiquetas)
+        with self._lock:
+            self._valores[clave] = self._valores.get(clave, 0) + cantidad
+
+
+class Gauge(_Metrica):
+    tipo = "gauge"
+
+    def inc(self, cantidad=1, **etiquetas):
+        clave = self._clave(etiquetas)
+        with self._lock:
+            self._valores[clave] = self._valores.get(clave, 0) + cantidad
+
+    def dec(self, cantidad=1, **etiquetas):
+        self.inc(-cantidad, **etiquetas)
+
+
+class Histograma(_Metrica):
+    tipo = "histogram"
+
+    def __init__(self, nombre, ayuda, etiquetas=(), buckets=BUCKETS):
+        super().__init__(nombre, ayuda, etiquetas)
+        self.buckets = buckets
+
+    def observar(self, valor, **etiquetas):
+        clave = self._clave(etiquetas)
+        with self._lock:
+            datos = self._valores.get(clave)
+            if datos is None:
+                datos = self._valores[clave] = [[0] * len(self.buckets), 0, 0.0]
+            for i, limite in enumerate(self.buckets):
+                if valor <= limite:
+                    datos[0][i] += 1
+            datos[1] += 1
+            datos[2] += valor
+
+    def _lineas(self, clave, valor):
+        conteos, total, suma = valor
+        nombres = self.etiquetas + ("le",)
+        lineas = [
+            f"{self.nombre}_bucket{_etiquetas(nombres, clave + (limite,))} {n}"
+            for limite, n in zip(self.buckets, conteos)
+        ]
+        lineas.append(f"{self.nombre}_bucket{_etiquetas(nombres, clave + ('+Inf',))} {total}")
+        lineas.append(f"{self.nombre}_count{_etiquetas(self.etiquetas, clave)} {total}")
+        lineas.append(f"{self.nombre}_sum{_etiquetas(self.etiquetas, clave)} {suma}")
+        return lineas
+
+
+class Registro:
+    def __init__(self):
+        self._metricas = []
+        self._recolectores = []
+
+    def agregar(self, metrica):
+        self._metricas.append(metrica)
+        return metrica
+
+    def contador(self, nombre, ayuda, etiquetas=()):
+        return self.agregar(Contador(nombre, ayuda, etiquetas))
+
+    def gauge(self, nombre, ayuda, etiquetas=()):
+        return self.agregar(Gauge(nombre, ayuda, etiquetas))
+
+    def histograma(self, nombre, ayuda, etiquetas=(), buckets=BUCKETS):
+        return self.agregar(Histograma(nombre, ayuda, etiquetas, buckets))
+
+    def recolector(self, funcion):
+        """funcion() se llama en cada scrape para actualizar gauges (pool, cola...)."""
+        self._recolectores.append(funcion)
+        return funcion
+
+    def exponer(self):
+        for funcion in self._recolectores:
+            try:
+                funcion()
+            except Exception:
+                pass  # un recolector roto no debe tumbar /metrics
+        lineas = []
+        for metrica in self._metricas:
+            lineas.extend(metrica.exponer())
+        return "\n".join(lineas) + "\n"
+
+
+registro = Registro()
+
+
+# ------------------- FASES POR PETICION -------------------
+
+@lru_cache(maxsize=512)
+def etiqueta_sql(sql):
+    """'SELECT ... FROM examenes WHERE ...' -> 'SELECT examenes' (baja cardinalidad)."""
+    if not sql:
+        return "desconocida"
+    verbo = sql.lstrip().split(None, 1)[0].upper()
+    tabla = re.search(r"\b(?:FROM|INTO|UPDATE|JOIN)\s+([A-Za-z_][A-Za-z0-9_]*)", sql, re.IGNORECASE)
+    return f"{verbo} {tabla.group(1)}" if tabla else verbo
+
+
+def acumular_fase(fase, segundos):
+    if has_request_context():
+        fases = g.setdefault("fases", {})
+        total, n = fases.get(fase, (0.0, 0))
+        fases[fase] = (total + segundos, n + 1)
+
+
+@contextmanager
+def medir(histograma, fase=None, errores=None, **etiquetas):
+    """Observa la duracion del bloque y la suma a la fase de la peticion actual."""
+    inicio = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        if errores is not None:
+            errores.inc(**etiquetas)
+        raise
+    finally:
+        duracion = time.perf_counter() - inicio
+        histograma.observar(duracion, **etiquetas)
+        if fase:
+            acumular_fase(fase, duracion)
+
+
+def desglose(fases):
+    return ", ".join(
+        f"{fase} {segundos * 1000:.0f} ms/{n}" for fase, (segundos, n) in sorted(fases.items())
+    ) or "sin fases"
+
+
+def server_timing(fases, total):
+    partes = [
+        f'{fase};dur={segundos * 1000:.1f};desc="{n} llamadas"'
+        for fase, (segundos, n) in sorted(fases.items())
+    ]
+    partes.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(partes)
@@ -0,0 +1,183 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+import threading
+from collections import OrderedDict
+
+try:
+    import brotli
+except ImportError:  # opcional: sin el paquete Brotli solo se usa gzip
+    brotli = None
+
+# ------------------- RESPUESTAS -------------------
+#
+# Compresion del HTML que genera la app, con ETag por contenido solo en las
+# paginas fijas, y archivos de static/ con huella en la URL y copias
+# precomprimidas hechas al arrancar.
+
+COMPRIMIBLES = {
+    "text/html", "text/plain", "text/css", "text/csv", "application/javascript",
+    "application/json", "image/svg+xml",
+}
+TAM_MINIMO = 512  # por debajo de esto los encabezados pesan mas que el ahorro
+
+# Las paginas fijas (login, registro) mandan los mismos bytes en cada visita:
+# se guardan ya comprimidas por (huella, codificacion). Solo esas: las paginas
+# de cada alumno cambian con cada visita y desalojarian a las fijas
+COMPRIMIDAS_MAX = 64
+_comprimidas = OrderedDict()
+_comprimidas_lock = threading.Lock()
+
+
+def elegir_codificacion(accept_encodings):
+    if brotli is not None and accept_encodings["br"]:
+        return "br"
+    if accept_encodings["gzip"]:
+        return "gzip"
+    return None
+
+
+def comprimir(datos, codificacion, maximo=False):
+    # Nivel medio para respuestas por peticion; maximo para lo que se hace una vez
+    if codificacion == "br":
+        return brotli.compress(datos, quality=11 if maximo else 5)
+    return gzip.compress(datos, compresslevel=9 if maximo else 6, mtime=0)
+
+
+def comprimir_respuesta(response, request, fija=False):
+    """Compresion, y en las paginas fijas ETag del contenido y 304.
+
+    Solo las paginas fijas (fija=True) llevan ETag y guardan su cuerpo
+    comprimido: las de cada alumno hay que renderizarlas completas para sacar
+    la huella, asi que un 304 no ahorraria trabajo. El ETag lleva la
+    codificacion: la misma pagina en gzip y sin comprimir son representaciones
+    distintas. Solo aplica a respuestas ya completas en memoria (no a archivos
+    ni a streams, como el ZIP de exportar).
+    """
+    if (
+        response.status_code != 200
+        or response.direct_passthrough
+        or response.is_streamed
+        or "Content-Encoding" in response.headers
+        or response.mimetype not in COMPRIMIBLES
+    ):
+        return response
+
+    datos = response.get_data()
+    codificacion = elegir_codificacion(request.accept_encodings) if len(datos) >= TAM_MINIMO else None
+    response.vary.add("Accept-Encoding")
+
+    if not fija:
+        if codificacion:
+            response.set_data(comprimir(datos, codificacion))
+            response.headers["Content-Encoding"] = codificacion
+        return response
+
+    huella = hashlib.sha256(datos).hexdigest()[:20]
+    if request.method in ("GET", "HEAD"):
+        response.set_etag(f"{huella}-{codificacion}" if codificacion else huella)
+        if not response.cache_control.max_age:
+            response.cache_control.no_cache = True  # se puede guardar, pero se revalida
+        response.make_conditional(request)
+        if response.status_code == 304:
+            return response
+
+    if codificacion:
+        response.set_data(_comprimida(datos, huella, codificacion))
+        response.headers["Content-Encoding"] = codificacion
+    return response
+
+
+def _comprimida(datos, huella, codificacion):
+    clave = (huella, codificacion)
+    with _comprimidas_lock:
+        if clave in _comprimidas:
+            _comprimidas.move_to_end(clave)
+            return _comprimidas[clave]
+
+    comprimido = comprimir(datos, codificacion)
+    with _comprimidas_lock:
+        _comprimidas[clave] = comprimido
+        if len(_comprimidas) > COMPRIMIDAS_MAX:
+            _comprimidas.popitem(last=False)
+    return comprimido
+
+
+class Estaticos:
+    """Huella de contenido de cada archivo de static/ y sus copias .br/.gz.
+
+    La huella va en la URL (?v=...), asi el navegador puede guardar el archivo
+    un ano: si cambia el contenido cambia la URL.
+    """
+
+    def __init__(self, carpeta, cache):
+        self.carpeta = carpeta
+        self.cache = cache
+        self._versiones = {}  # nombre -> (mtime, tamano, huella)
+        self._lock = threading.Lock()
+
+    def _ruta(self, nombre):
+        ruta = os.path.abspath(os.path.join(self.carpeta, nombre))
+        if not ruta.startswith(os.path.abspath(self.carpeta) + os.sep):
+            return None
+        return ruta
+
+    def version(self, nombre):
+        ruta = self._ruta(nombre)
+        try:
+            info = os.stat(ruta) if ruta else None
+        except OSError:
+            return None
+        if info is None:
+            return None
+
+        guardada = self._versiones.get(nombre)
+        if guardada and guardada[:2] == (info.st_mtime, info.st_size):
+            return guardada[2]
+
+        with open(ruta, "rb") as f:
+            huella = hashlib.sha256(f.read()).hexdigest()[:12]
+        with self._lock:
+            self._versiones[nombre] = (info.st_mtime, info.st_size, huella)
+        return huella
+
+    def variante(self, nombre, codificacion):
+        """Ruta de la copia precomprimida, si existe y es mas chica que el original."""
+        version = self.version(nombre)
+        if version is None or codificacion is None:
+            return None
+        extension = "br" if codificacion == "br" else "gz"
+        ruta = os.path.join(self.cache, f"{version}-{os.path.basename(nombre)}.{extension}")
+        return ruta if os.path.exists(ruta) else None
+
+    def precomprimir(self):
+        """Genera las copias .br/.gz que ahorran bytes. Devuelve cuantas hay."""
+        os.makedirs(self.cache, exist_ok=True)
+        hechas = 0
+        codificaciones = ["gzip"] + (["br"] if brotli is not None else [])
+        for raiz, _, archivos in os.walk(self.carpeta):
+            for archivo in archivos:
+                nombre = os.path.relpath(os.path.join(raiz, archivo), self.carpeta)
+                version = self.version(nombre)
+                with open(os.path.join(raiz, archivo), "rb") as f:
+                    datos = f.read()
+                for codificacion in codificaciones:
+                    extension = "br" if codificacion == "br" else "gz"
+                    destino = os.path.join(self.cache, f"{version}-{archivo}.{extension}")
+                    if os.path.exists(destino):
+                        hechas += 1
+                        continue
+                    comprimido = comprimir(datos, codificacion, maximo=True)
+                    if len(comprimido) >= len(datos):
+                        continue
+                    parcial = f"{destino}.{os.getpid()}"
+                    with open(parcial, "wb") as f:
+                        f.write(comprimido)
+                    os.replace(parcial, destino)
+                    hechas += 1
+        return hechas
+
+
+def tipo_mime(nombre):
+    return mimetypes.guess_type(nombre)[0] or "application/octet-stream"
@@ -0,0 +1,213 @@
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+import traceback
+
+# ------------------- COLA DE TRABAJOS -------------------
+#
+# Cola persistente en un archivo SQLite propio (no en la base de la app) con
+# un pool de hilos que la consume. Los hilos arrancan de forma perezosa en el
+# proceso que encola, o en un proceso aparte con "flask --app app trabajos".
+
+PENDIENTE = "pendiente"
+EN_CURSO = "en_curso"
+HECHO = "hecho"
+FALLIDO = "fallido"
+
+
+class ColaTrabajos:
+    def __init__(self, ruta, hilos=2, intentos_max=5, espera_base=2.0,
+                 espera_max=300.0, visibilidad=600.0):
+        self.ruta = ruta
+        self.hilos = hilos
+        self.intentos_max = intentos_max
+        self.espera_base = espera_base
+        self.espera_max = espera_max
+        self.visibilidad = visibilidad  # un en_curso mas viejo que esto se reintenta
+
+        self._manejadores = {}
+        self._hay_trabajo = threading.Event()
+        self._detener = threading.Event()
+        self._lock = threading.Lock()
+        self._hilos = []
+        self._pid = None
+        self._tabla_creada = False  # se crea con el primer uso, no al importar la app
+
+    def _conectar(self):
+        conn = sqlite3.connect(self.ruta, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        if not self._tabla_creada:
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS trabajos (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    tipo TEXT NOT NULL,
+                    datos TEXT NOT NULL,
+                    estado TEXT NOT NULL DEFAULT 'pendiente',
+                    intentos INTEGER NOT NULL DEFAULT 0,
+                    disponible_en REAL NOT NULL,
+                    error TEXT,
+                    creado REAL NOT NULL,
+                    actualizado REAL NOT NULL
+                )"""
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_trabajos_pendientes ON trabajos (estado, disponible_en)"
+            )
+            self._tabla_creada = True
+        return conn
+
+    def registrar(self, tipo, funcion, al_fallar=None):
+        """funcion(datos) hace el trabajo; al_fallar(datos, error) tras agotar reintentos."""
+        self._manejadores[tipo] = (funcion, al_fallar)
+
+    def encolar(self, tipo, datos):
+        ahora = time.time()
+        conn = self._conectar()
+        try:
+            cursor = conn.execute(
+                "INSERT INTO trabajos (tipo, datos, disponible_en, creado, actualizado) VALUES (?, ?, ?, ?, ?)",
+                (tipo, json.dumps(datos), ahora, ahora, ahora)
+            )
+            trabajo_id = cursor.lastrowid
+        finally:
+            conn.close()
+        self._hay_trabajo.set()
+        return trabajo_id
+
+    def conteo(self):
+        """{estado: cantidad} de la cola, para /metrics."""
+        conn = self._conectar()
+        try:
+            conteo = dict.fromkeys((PENDIENTE, EN_CURSO, HECHO, FALLIDO), 0)
+            conteo.update(conn.execute("SELECT estado, COUNT(*) FROM trabajos GROUP BY estado").fetchall())
+            return conteo
+        finally:
+            conn.close()
+
+    def activos(self, tipo, campo):
+        """Valores de datos[campo] de los trabajos de `tipo` que aun pueden correr."""
+        conn = self._conectar()
+        try:
+            filas = conn.execute(
+                "SELECT json_extract(datos, ?) FROM trabajos WHERE tipo=? AND estado IN (?, ?)",
+                (f"$.{campo}", tipo, PENDIENTE, EN_CURSO)
+            ).fetchall()
+            return {fila[0] for fila in filas}
+        finally:
+            conn.close()
+
+    def purgar(self, retencion):
+        """Borra los trabajos terminados (hechos o fallidos) hace mas de `retencion` segundos."""
+        conn = self._conectar()
+        try:
+            cursor = conn.execute(
+                "DELETE FROM trabajos WHERE estado IN (?, ?) AND actualizado<?",
+                (HECHO, FALLIDO, time.time() - retencion)
+            )
+            return cursor.rowcount
+        finally:
+            conn.close()
+
+    # ---- consumo ----
+
+    def iniciar(self):
+        # Idempotente y seguro tras fork: los hilos no sobreviven al fork,
+        # asi que un proceso hijo arranca los suyos
+        with self._lock:
+            if self._pid == os.getpid() and any(h.is_alive() for h in self._hilos):
+                return
+            self._pid = os.getpid()
+            self._detener.clear()
+            self._hilos = [
+                threading.Thread(target=self._bucle, name=f"trabajos-{i}", daemon=True)
+                for i in range(self.hilos)
+            ]
+            for hilo in self._hilos:
+                hilo.start()
+
+    def detener(self, timeout=None):
+        self._detener.set()
+        self._hay_trabajo.set()
+        for hilo in self._hilos:
+            hilo.join(timeout)
+
+    def _tomar(self, conn):
+        ahora = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "UPDATE trabajos SET estado=?, actualizado=? WHERE estado=? AND actualizado<?",
+                (PENDIENTE, ahora, EN_CURSO, ahora - self.visibilidad)
+            )
+            fila = conn.execute(
+                "SELECT * FROM trabajos WHERE estado=? AND disponible_en<=? ORDER BY id LIMIT 1",
+                (PENDIENTE, ahora)
+            ).fetchone()
+            if fila is not None:
+                conn.execute(
+                    "UPDATE trabajos SET estado=?, intentos=intentos+1, actualizado=? WHERE id=?",
+                    (EN_CURSO, ahora, fila["id"])
+                )
+            conn.execute("COMMIT")
+            return fila
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _bucle(self):
+        conn = self._conectar()
+        while not self._detener.is_set():
+            try:
+                trabajo = self._tomar(conn)
+            except sqlite3.OperationalError:
+                trabajo = None
+
+            if trabajo is None:
+                self._hay_trabajo.wait(1.0)
+                self._hay_trabajo.clear()
+                continue
+
+            self._ejecutar(conn, trabajo)
+        conn.close()
+
+    def _ejecutar(self, conn, trabajo):
+        funcion, al_fallar = self._manejadores.get(trabajo["tipo"], (None, None))
+        datos = json.loads(trabajo["datos"])
+        intentos = trabajo["intentos"] + 1
+
+        try:
+            if funcion is None:
+                raise LookupError(f"Tipo de trabajo desconocido: {trabajo['tipo']}")
+            funcion(datos)
+        except Exception as e:
+            error = "".join(traceback.format_exception_only(type(e), e)).strip()
+            print(f"ERROR TRABAJO {trabajo['id']} ({trabajo['tipo']}), intento {intentos}:", error)
+
+            if intentos >= self.intentos_max:
+                conn.execute(
+                    "UPDATE trabajos SET estado=?, error=?, actualizado=? WHERE id=?",
+                    (FALLIDO, error, time.time(), trabajo["id"])
+                )
+                if al_fallar is not None:
+                    try:
+                        al_fallar(datos, error)
+                    except Exception as e2:
+                        print("ERROR al_fallar:", e2)
+            else:
+                espera = min(self.espera_max, self.espera_base * 2 ** (intentos - 1))
+                espera *= random.uniform(0.5, 1.0)  # jitter
+                conn.execute(
+                    "UPDATE trabajos SET estado=?, error=?, disponible_en=?, actualizado=? WHERE id=?",
+                    (PENDIENTE, error, time.time() + espera, time.time(), trabajo["id"])
+                )
+            return
+
+        # Los datos (el formulario del alumno) ya no hacen falta una vez hecho
+        conn.execute(
+            "UPDATE trabajos SET estado=?, datos='null', error=NULL, actualizado=? WHERE id=?",
+            (HECHO, time.time(), trabajo["id"])
+        )
@@ -0,0 +1,8 @@
+"""Punto de entrada de produccion.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+gunicorn.conf.py prepara cada worker despues del fork (esquema, cola,
+conserje) y lo apaga en orden; importar este modulo no abre conexiones.
+"""
+from app import app  # noqa: F401